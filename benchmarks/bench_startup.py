@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the wall clock cost of starting the wcm CLI.
+
+Runs ``wcm version`` in fresh interpreters with the PyPI version check
+disabled, with a warm version cache, and with a cold cache, and reports the
+median of each. With a warm cache the check should cost nothing.
+
+It also measures the cumulative import time of ``wcm.__main__`` reported by
+``python -X importtime`` and exits with status 1 when its median exceeds
+``--budget-ms``, so cold start regressions fail CI.
+
+    python benchmarks/bench_startup.py [--runs N] [--budget-ms MS]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC = str(Path(__file__).resolve().parent.parent / "src")
+
+# Cumulative import time budget for wcm.__main__, in milliseconds.
+IMPORT_BUDGET_MS = 100
+
+
+def _run(env, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "wcm", "version"],
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def _import_time(env, runs, module="wcm.__main__"):
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        for line in proc.stderr.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == module:
+                samples.append(int(fields[1]) / 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, WCM_HOME=home, PYTHONPATH=SRC)
+        env.pop("WCM_OFFLINE", None)
+        env.pop("WCM_NO_VERSION_CHECK", None)
+
+        imports = _import_time(dict(env, WCM_NO_VERSION_CHECK="1"), args.runs)
+        disabled = _run(dict(env, WCM_NO_VERSION_CHECK="1"), args.runs)
+
+        cache_dir = Path(home) / "cache"
+        cache_dir.mkdir()
+        with (cache_dir / "latest-version.json").open("w") as fh:
+            json.dump({"version": "0.0.0", "checked": time.time()}, fh)
+        warm = _run(env, args.runs)
+
+    with tempfile.TemporaryDirectory() as home:
+        cold = _run(dict(env, WCM_HOME=home), 1)
+
+    print(f"import wcm.__main__    : {imports:8.1f} ms (budget {args.budget_ms} ms)")
+    print(f"version check disabled : {disabled:8.1f} ms")
+    print(f"warm version cache     : {warm:8.1f} ms ({warm - disabled:+.1f} ms)")
+    print(f"cold version cache     : {cold:8.1f} ms ({cold - disabled:+.1f} ms)")
+
+    if imports > args.budget_ms:
+        print("FAIL: import time budget exceeded", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Measure publish, download, list and validate throughput against a local WINGS stand-in.
+
+Generates synthetic components of a few sizes, serves a stand-in WINGS server
+(``wcm.tests.wings_server``) with injected latency and bandwidth limits, and
+times each operation through the real ``wings`` client. Results are stored in
+``benchmarks/results/<commit>.json`` so a later run can be compared with the
+results of an earlier commit.
+
+    python benchmarks/bench_wings.py [--sizes small,large] [--counts 1,16]
+        [--latency-ms 20] [--bandwidth-kib 0] [--jobs 4] [--compare REF]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+sys.path.insert(0, str(ROOT / "src"))
+
+import yaml  # noqa: E402
+
+from wcm import _component, _download, _list, _transport, _validate, _yaml  # noqa: E402
+from wcm.tests.wings_server import FakeWings  # noqa: E402
+
+KIB = 1024
+MIB = 1024 * KIB
+
+# Code size, number of data files and size of each data file.
+SIZES = {
+    "small": (4 * KIB, 1, 16 * KIB),
+    "medium": (256 * KIB, 2, 256 * KIB),
+    "large": (4 * MIB, 4, 1 * MIB),
+}
+
+
+def make_component(root, n, size):
+    """Write a synthetic component and return its size in bytes."""
+    src_bytes, n_files, file_bytes = SIZES[size]
+    comp = root / f"bench{n}"
+    (comp / "src").mkdir(parents=True)
+    (comp / "data").mkdir()
+    (comp / "src" / "run").write_text("#!/bin/bash\necho bench\n")
+    # Half random, half repetitive, so the archive compresses like real code.
+    (comp / "src" / "blob.bin").write_bytes(
+        os.urandom(src_bytes // 2) + b"x" * (src_bytes - src_bytes // 2)
+    )
+
+    data = {}
+    for f in range(n_files):
+        name = f"data/file{f}.csv"
+        (comp / name).write_bytes(os.urandom(file_bytes))
+        data[f"BenchType{f}"] = {"files": [name], "format": "csv"}
+    io = [
+        {
+            "role": f"in{f}",
+            "prefix": f"-i{f}",
+            "isParam": False,
+            "type": f"dcdom:BenchType{f}",
+            "dimensionality": 0,
+        }
+        for f in range(n_files)
+    ]
+    spec = {
+        "name": f"bench{n}",
+        "version": "1.0.0",
+        "schemaVersion": "0.0.1",
+        "wings": {
+            "componentType": f"Bench{size.title()}",
+            "documentation": "Synthetic benchmark component",
+            "inputs": io,
+            "outputs": [
+                {
+                    "role": "out",
+                    "prefix": "-o",
+                    "isParam": False,
+                    "type": "dcdom:BenchType0",
+                    "dimensionality": 0,
+                }
+            ],
+            "data": data,
+        },
+    }
+    with (comp / "wings-component.yml").open("w") as fh:
+        yaml.dump(spec, fh, sort_keys=False)
+    return sum(p.stat().st_size for p in comp.rglob("*") if p.is_file())
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def _row(scenario, size, count, seconds, nbytes=0):
+    return {
+        "scenario": scenario,
+        "size": size,
+        "count": count,
+        "seconds": round(seconds, 4),
+        "items_per_s": round(count / seconds, 2),
+        "mib_per_s": round(nbytes / MIB / seconds, 2) if nbytes else None,
+    }
+
+
+def run_case(size, count, args):
+    latency, bandwidth = args.latency_ms / 1000, args.bandwidth_kib * KIB or None
+    with tempfile.TemporaryDirectory() as tmp, FakeWings(latency, bandwidth) as srv:
+        tmp = Path(tmp)
+        os.environ.update(
+            WCM_HOME=str(tmp / "home"),
+            WCM_OFFLINE="1",
+            WCM_CREDENTIALS_FILE=str(tmp / "home" / "credentials"),
+            WCM_WINGS_SERVER=srv.url,
+            WCM_WINGS_EXPORT_URL="http://wings.bench",
+            WCM_USER="bench",
+            WCM_PASSWORD="bench",
+            WCM_DOMAIN="bench",
+        )
+        nbytes = sum(make_component(tmp / "components", n, size) for n in range(count))
+        dirs = _component.find_components([tmp / "components"], recursive=True)
+        specs = _validate.find_specs(dirs)
+        rows = []
+
+        _yaml.clear_cache()
+        seconds, _ = _timed(lambda: _validate.validate_files(specs, jobs=args.jobs))
+        rows.append(_row("validate", size, count, seconds))
+
+        seconds, results = _timed(
+            lambda: _component.deploy_components(dirs, jobs=args.jobs)
+        )
+        failed = [r for r in results if r.status != "published"]
+        if failed:
+            raise RuntimeError(f"publish failed: {failed[0]}")
+        rows.append(_row("publish", size, count, seconds, nbytes))
+
+        seconds, _ = _timed(lambda: _list.fetch_classes(refresh=True))
+        rows.append(_row("list", size, count, seconds))
+
+        out = tmp / "downloads"
+        out.mkdir()
+        seconds, results = _timed(
+            lambda: _download.download_components(
+                all_components=True, download_path=str(out), jobs=args.jobs
+            )
+        )
+        if len(results) != count or any(r.status != "downloaded" for r in results):
+            raise RuntimeError(f"download failed: {results}")
+        rows.append(_row("download", size, count, seconds))
+
+        rows.append(
+            {
+                "scenario": "requests",
+                "size": size,
+                "count": count,
+                "by_endpoint": dict(srv.state.requests),
+            }
+        )
+        _transport.close()
+        return rows
+
+
+def _commit(ref="HEAD"):
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "--short", ref],
+            cwd=str(ROOT),
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    if ref == "HEAD":
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=str(ROOT),
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        ).stdout.strip()
+        if dirty:
+            sha += "-dirty"
+    return sha
+
+
+def _compare(rows, baseline):
+    old = {
+        (r["scenario"], r["size"], r["count"]): r
+        for r in baseline["results"]
+        if "seconds" in r
+    }
+    print(f"\ncompared with {baseline['commit']}:")
+    for r in rows:
+        prev = old.get((r["scenario"], r["size"], r["count"]))
+        if prev and "seconds" in r:
+            change = (r["seconds"] - prev["seconds"]) / prev["seconds"] * 100
+            print(
+                f"{r['scenario']:<10}{r['size']:<8}{r['count']:>6}"
+                f"{prev['seconds']:>11.3f}s{r['seconds']:>11.3f}s{change:>+9.1f}%"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="small,medium")
+    parser.add_argument("--counts", default="1,16")
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--bandwidth-kib", type=int, default=0, help="0 for unlimited")
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument(
+        "--output", help="Results file, benchmarks/results/<commit>.json by default"
+    )
+    parser.add_argument(
+        "--compare", metavar="REF", help="Commit, or results file, to compare with"
+    )
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        path = Path(args.compare)
+        if not path.exists():
+            path = RESULTS_DIR / f"{_commit(args.compare)}.json"
+        if not path.exists():
+            print(f"no results for {args.compare}", file=sys.stderr)
+            sys.exit(1)
+        with path.open() as fh:
+            baseline = json.load(fh)
+
+    rows = []
+    print(
+        f"{'scenario':<10}{'size':<8}{'count':>6}"
+        f"{'seconds':>12}{'items/s':>10}{'MiB/s':>9}"
+    )
+    for size in args.sizes.split(","):
+        for count in map(int, args.counts.split(",")):
+            for r in run_case(size, count, args):
+                rows.append(r)
+                if "seconds" in r:
+                    mib = "-" if r["mib_per_s"] is None else f"{r['mib_per_s']:.1f}"
+                    print(
+                        f"{r['scenario']:<10}{r['size']:<8}{r['count']:>6}"
+                        f"{r['seconds']:>11.3f}s{r['items_per_s']:>10.1f}{mib:>9}"
+                    )
+
+    commit = _commit()
+    report = {
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+        "results": rows,
+    }
+    output = (
+        Path(args.output)
+        if args.output
+        else RESULTS_DIR / f"{commit or 'unknown'}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with output.open("w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nresults written to {output}")
+
+    if baseline:
+        _compare(rows, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Compare YAML parse and dump times for large component specifications.
+
+Times the pure Python loader/dumper, libyaml's CLoader/CDumper (when PyYAML
+was built with it) and a cached ``_yaml.load`` of an unchanged file.
+
+    python benchmarks/bench_yaml.py [--inputs N] [--runs N]
+"""
+
+import argparse
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from wcm import _yaml  # noqa: E402
+
+
+def make_spec(n):
+    io = [
+        {
+            "role": f"arg{i}",
+            "prefix": f"-a{i}",
+            "isParam": i % 3 == 0,
+            "type": "dcdom:Table",
+            "dimensionality": 0,
+        }
+        for i in range(n)
+    ]
+    return {
+        "name": "large",
+        "version": "1.0.0",
+        "schemaVersion": "0.0.1",
+        "wings": {
+            "componentType": "Large",
+            "documentation": "A large component " * 50,
+            "inputs": io,
+            "outputs": io,
+            "data": {
+                f"Type{i}": {"files": [f"data/file{i}.csv"], "format": "csv"}
+                for i in range(n)
+            },
+        },
+    }
+
+
+def _time(fn, runs):
+    return min(timeit.repeat(fn, number=1, repeat=runs)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--inputs", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    spec = make_spec(args.inputs)
+    text = yaml.dump(spec, sort_keys=False)
+    print(f"spec size: {len(text) / 1024:.0f} KiB")
+
+    rows = [
+        ("load pure Python", lambda: yaml.load(text, Loader=yaml.Loader)),
+        ("load _yaml (C if available)", lambda: _yaml.loads(text)),
+        (
+            "dump pure Python",
+            lambda: yaml.dump(spec, Dumper=yaml.Dumper, sort_keys=False),
+        ),
+        ("dump _yaml (C if available)", lambda: _yaml.dump(spec)),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "wings-component.yml"
+        path.write_text(text)
+
+        def uncached():
+            _yaml.clear_cache()
+            return _yaml.load(path)
+
+        _yaml.load(path)
+        rows.append(("_yaml.load uncached file", uncached))
+        rows.append(("_yaml.load cached file", lambda: _yaml.load(path)))
+
+        print(f"libyaml available: {_yaml.Loader is not yaml.Loader}")
+        for label, fn in rows:
+            print(f"{label:<30}: {_time(fn, args.runs):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,11 @@ install_requires = [
     "requests",
 ]
 
+extras_require = {
+    # Code generated schema validation for `wcm validate` and publish.
+    "fast": ["fastjsonschema"],
+}
+
 
 # Utility function to read the README file.
 def read(fname):
@@ -55,8 +60,6 @@ setup(
         "Development Status :: 3 - Alpha",
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
         "Intended Audience :: Science/Research",
         "Operating System :: Unix",
@@ -68,5 +71,6 @@ setup(
     exclude_package_data={"wcm": ["tests/*"]},
     zip_safe=False,
     install_requires=install_requires,
-    python_requires=">=3.5.0",
+    extras_require=extras_require,
+    python_requires=">=3.7.0",
 )
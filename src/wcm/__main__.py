@@ -13,26 +13,87 @@ from pathlib import Path
 
 import click
 
-import semver
-
 import wcm
-from wcm import _component, _utils, _download, _list, _makeyaml
+from wcm import _utils
+
+# Sub commands import their dependencies (wings, requests, yaml, jsonschema, ...)
+# when they run, so `wcm version` and `wcm --help` only pay for click.
 
 __DEFAULT_WCM_CREDENTIALS_FILE__ = "~/.wcm/credentials"
 
 
 @click.group()
 @click.option("--verbose", "-v", default=0, count=True)
-def cli(verbose):
+@click.option(
+    "--offline",
+    envvar="WCM_OFFLINE",
+    is_flag=True,
+    help="Do not check PyPI for a newer wcm release.",
+)
+@click.option("--timings", is_flag=True, help="Print the time spent in each phase.")
+@click.option(
+    "--timings-json",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write the time spent in each phase to a JSON file.",
+)
+@click.option(
+    "--trace",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write a Chrome trace (chrome://tracing, Perfetto) of each phase.",
+)
+@click.pass_context
+def cli(ctx, verbose, offline=False, timings=False, timings_json=None, trace=None):
     _utils.init_logger()
-    lv = ".".join(_utils.get_latest_version().split(".")[:3])
-    cv = ".".join(wcm.__version__.split(".")[:3])
+    if offline:
+        os.environ["WCM_OFFLINE"] = "1"
+
+    check = _utils.VersionCheck().start()
+    ctx.call_on_close(lambda: _warn_if_outdated(check.result()))
+
+    if timings or timings_json or trace:
+        from wcm import _timing
+
+        _timing.enable()
+        ctx.call_on_close(lambda: _report_timings(timings, timings_json, trace))
+
+
+def _report_timings(table, json_file, trace_file):
+    from wcm import _timing, _transport
+
+    if table:
+        for line in _timing.format_table():
+            click.echo(line, err=True)
+    if json_file:
+        _timing.write_json(json_file, connections=_transport.stats())
+    if trace_file:
+        _timing.write_trace(trace_file)
+
+
+def _release(version):
+    # Major, minor and patch as integers, compared without importing semver on
+    # every invocation.
+    parts = tuple(int(p) for p in version.split(".")[:3])
+    return parts + (0,) * (3 - len(parts))
+
+
+def _warn_if_outdated(lv):
+    if not lv:
+        return
+
+    lv = ".".join(lv.split(".")[:3])
+    try:
+        outdated = _release(lv) > _release(wcm.__version__)
+    except ValueError:
+        return
 
-    if semver.compare(lv, cv) > 0:
+    if outdated:
         click.secho(
             f"""WARNING: You are using wcm version {wcm.__version__}, however version {lv} is available.
 You should consider upgrading via the 'pip install --upgrade wcm' command.""",
             fg="yellow",
+            err=True,
         )
 
 
@@ -125,29 +186,354 @@ def configure(profile="default"):
 
 @cli.command(help="Deploy the pacakge to the wcm.")
 @click.option("--debug/--no-debug", "-d/-nd", default=False)
-@click.option("--dry-run", "-n", is_flag=True)
+@click.option(
+    "--dry-run",
+    "-n",
+    is_flag=True,
+    help="Print the operations and bytes a publish would send, without changing "
+    "anything",
+)
 @click.option("--ignore-data/--no-ignore-data", "-i/-ni", default=False)
 @click.option("--overwrite", "-f", is_flag=True, help="Replace existing components")
+@click.option(
+    "--full",
+    is_flag=True,
+    help="Send every part of a replaced component, even if unchanged since the last "
+    "publish",
+)
 @click.option(
     "--profile",
     "-p",
+    "profiles",
     envvar="WCM_PROFILE",
     type=str,
-    default="default",
+    multiple=True,
+    default=("default",),
     metavar="<profile-name>",
+    help="Profile, or profile group, to publish to; repeat to publish to several",
+)
+@click.option(
+    "--recursive",
+    "-r",
+    is_flag=True,
+    help="Publish every component found under the given directories",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(1, None),
+    default=4,
+    show_default=True,
+    help="Number of components published concurrently",
+)
+@click.option(
+    "--upload-jobs",
+    type=click.IntRange(1, None),
+    default=4,
+    show_default=True,
+    help="Number of data files uploaded concurrently per component",
+)
+@click.option(
+    "--compress-level",
+    type=click.IntRange(0, 9),
+    default=None,
+    help="Deflate level of the code archive, 0 stores files uncompressed  [default: 6]",
 )
 @click.argument(
-    "component",
+    "components",
+    nargs=-1,
     type=click.Path(file_okay=False, dir_okay=True, writable=True, exists=True),
+)
+def publish(
+    components,
+    profiles=("default",),
+    debug=False,
+    dry_run=False,
+    ignore_data=False,
+    overwrite=False,
+    recursive=False,
+    jobs=4,
+    full=False,
+    compress_level=None,
+    upload_jobs=4,
+):
+    from wcm import _component, _session
+
+    components = components or (".",)
+    profiles = _session.expand_profiles(profiles)
+    if dry_run:
+        _print_plans(
+            _component.plan_components(
+                _component.find_components(components, recursive=recursive),
+                profiles=profiles,
+                jobs=jobs,
+                ignore_data=ignore_data,
+                overwrite=overwrite,
+                incremental=not full,
+                compresslevel=compress_level,
+            )
+        )
+        return
+
+    if len(components) == 1 and not recursive and len(profiles) == 1:
+        logging.info("Publishing component")
+        _component.deploy_component(
+            components[0],
+            profile=profiles[0],
+            debug=debug,
+            dry_run=dry_run,
+            ignore_data=ignore_data,
+            overwrite=overwrite,
+            incremental=not full,
+            compresslevel=compress_level,
+            upload_jobs=upload_jobs,
+        )
+        click.secho(f"Success", fg="green")
+        return
+
+    component_dirs = _component.find_components(components, recursive=recursive)
+    logging.info(
+        f"Publishing {len(component_dirs)} components to {len(profiles)} profiles"
+    )
+    results = _component.deploy_components(
+        component_dirs,
+        profiles=profiles,
+        jobs=jobs,
+        ignore_data=ignore_data,
+        overwrite=overwrite,
+        incremental=not full,
+        compresslevel=compress_level,
+        upload_jobs=upload_jobs,
+    )
+
+    if len(profiles) == 1:
+        _print_results(results, lambda r: f"{r.component_dir} ({r.id or '-'})")
+        return
+    for line in _component.format_targets(results):
+        click.echo(line)
+    _print_results(
+        results, lambda r: f"{r.profile:<12} {r.component_dir} ({r.id or '-'})"
+    )
+
+
+def _print_plans(plans):
+    from wcm import _component
+
+    colors = {"skipped": "yellow", "failed": "red", "unchanged": "green"}
+    several = len({plan.profile for plan in plans}) > 1
+    for n, plan in enumerate(plans):
+        if several and (n == 0 or plans[n - 1].profile != plan.profile):
+            click.secho(f"{plan.profile}:", bold=True)
+        lines = _component.format_plan(plan)
+        click.secho(lines[0], fg=colors.get(plan.status))
+        for line in lines[1:]:
+            click.echo(line)
+
+    todo = [p for p in plans if p.status == "publish"]
+    failed = sum(p.status == "failed" for p in plans)
+    click.secho(
+        f"{len(todo)} to publish, "
+        f"{len(plans) - len(todo) - failed} unchanged or skipped, {failed} failed: "
+        f"{sum(map(_component.plan_requests, todo))} requests, "
+        f"{_component.format_size(sum(map(_component.plan_bytes, todo)))}",
+        fg="red" if failed else "green",
+    )
+    if failed:
+        sys.exit(1)
+
+
+def _print_results(results, describe):
+    """Print one line per result of a batch operation and exit non-zero on failures."""
+    colors = {
+        "skipped": "yellow",
+        "blocked": "yellow",
+        "cancelled": "yellow",
+        "failed": "red",
+    }
+    for r in results:
+        detail = f": {r.error}" if r.error else ""
+        color = colors.get(r.status, "green")
+        click.secho(f"{r.status:<10} {describe(r)}{detail}", fg=color)
+
+    failed = sum(r.status == "failed" for r in results)
+    click.secho(
+        f"{len(results) - failed} succeeded, {failed} failed",
+        fg="red" if failed else "green",
+    )
+    if failed:
+        sys.exit(1)
+
+
+@cli.command(
+    help="Publish every component under a directory, creating shared types once."
+)
+@click.option(
+    "--profile",
+    "-p",
+    envvar="WCM_PROFILE",
+    type=str,
+    default="default",
+    metavar="<profile-name>",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(1, None),
+    default=4,
+    show_default=True,
+    help="Number of types and components worked on concurrently",
+)
+@click.option(
+    "--fail-fast/--continue-on-error",
+    default=False,
+    show_default=True,
+    help="Stop starting new work after the first failure",
+)
+@click.option(
+    "--graph", is_flag=True, help="Print the dependency graph without publishing"
+)
+@click.option("--ignore-data/--no-ignore-data", "-i/-ni", default=False)
+@click.option("--overwrite", "-f", is_flag=True, help="Replace existing components")
+@click.option(
+    "--full",
+    is_flag=True,
+    help="Send every part of a replaced component, even if unchanged since the last "
+    "publish",
+)
+@click.option(
+    "--upload-jobs",
+    type=click.IntRange(1, None),
+    default=4,
+    show_default=True,
+    help="Number of data files uploaded concurrently per component",
+)
+@click.option(
+    "--compress-level",
+    type=click.IntRange(0, 9),
+    default=None,
+    help="Deflate level of the code archive, 0 stores files uncompressed  [default: 6]",
+)
+@click.argument(
+    "root",
+    type=click.Path(file_okay=False, dir_okay=True, exists=True),
     default=".",
 )
-def publish(component, profile="default", debug=False, dry_run=False, ignore_data=False, overwrite=False):
-    logging.info("Publishing component")
-    _component.deploy_component(
-        component, profile=profile, debug=debug, dry_run=dry_run, ignore_data=ignore_data, overwrite=overwrite
+def workspace(
+    root,
+    profile="default",
+    jobs=4,
+    fail_fast=False,
+    graph=False,
+    ignore_data=False,
+    overwrite=False,
+    full=False,
+    upload_jobs=4,
+    compress_level=None,
+):
+    from wcm import _workspace
+
+    dependencies, errors = _workspace.discover(root)
+    if graph:
+        for line in _workspace.format_graph(dependencies):
+            click.echo(line)
+        return
+
+    invalid = [
+        _workspace.NodeResult(_workspace.Node("component", d), "failed", err)
+        for d, err in errors.items()
+    ]
+    if invalid and fail_fast:
+        _print_results(invalid, lambda r: f"{r.node.kind:<14} {r.node.name}")
+
+    logging.info(f"Publishing {len(dependencies.specs)} components")
+    results = _workspace.publish_workspace(
+        dependencies,
+        profile=profile,
+        jobs=jobs,
+        fail_fast=fail_fast,
+        ignore_data=ignore_data,
+        overwrite=overwrite,
+        incremental=not full,
+        compresslevel=compress_level,
+        upload_jobs=upload_jobs,
     )
+    _print_results(invalid + results, lambda r: f"{r.node.kind:<14} {r.node.name}")
+
+
+@cli.command(help="Compare a component with its description on the wings server.")
+@click.option(
+    "--profile",
+    "-p",
+    envvar="WCM_PROFILE",
+    type=str,
+    default="default",
+    metavar="<profile-name>",
+)
+@click.argument(
+    "component",
+    type=click.Path(file_okay=False, dir_okay=True, exists=True),
+    default=".",
+)
+def diff(component, profile="default"):
+    from wcm import _component, _diff
+
+    try:
+        _id, changes = _component.diff_component(component, profile=profile)
+    except ValueError as err:
+        logging.error(err)
+        sys.exit(2)
+
+    if changes is None:
+        click.secho(f"{_id} does not exist on the server", fg="yellow")
+        sys.exit(1)
+    colors = {"+": "green", "-": "red", "~": "yellow"}
+    for change in changes:
+        line = _diff.format_change(change)
+        click.secho(line, fg=colors[line[0]])
+    if changes:
+        sys.exit(1)
+    click.secho(f"{_id} matches the server", fg="green")
+
 
-    click.secho(f"Success", fg="green")
+@cli.command(help="Validate component specifications offline.")
+@click.option(
+    "--recursive",
+    "-r",
+    is_flag=True,
+    help="Validate every component found under the given directories",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(1, None),
+    default=None,
+    help="Number of validation processes  [default: number of CPUs]",
+)
+@click.option(
+    "--json", "as_json", is_flag=True, help="Print one JSON object per specification"
+)
+@click.argument("paths", nargs=-1, type=click.Path(exists=True))
+def validate(paths, recursive=False, jobs=None, as_json=False):
+    import json
+
+    from wcm import _validate
+
+    specs = _validate.find_specs(paths or (".",), recursive=recursive)
+    results = _validate.validate_files(specs, jobs=jobs)
+
+    for r in results:
+        if as_json:
+            click.echo(
+                json.dumps({"path": r.path, "valid": not r.errors, "errors": r.errors})
+            )
+        elif r.errors:
+            for e in r.errors:
+                click.secho(f"{r.path}: {e['path']}: {e['message']}", fg="red")
+        else:
+            click.secho(f"{r.path}: OK", fg="green")
+
+    if any(r.errors for r in results):
+        sys.exit(1)
 
 
 @cli.command(help="Download a component from wings server. Data stored in .yaml file and source code downloaded to "
@@ -167,11 +553,67 @@ def publish(component, profile="default", debug=False, dry_run=False, ignore_dat
     default=None,
 )
 @click.option("--force", "-f", is_flag=True, help="Force Download, even if component already exists in local directory")
-@click.argument("component_id", default=None, type=str)
-def download(component_id, profile="default", path=None, force=False):
-    logging.info("Downloading component")
-    _download.download(component_id, profile=profile, download_path=path, overwrite=force)
-    click.secho(f"Success", fg="green")
+@click.option(
+    "--all",
+    "-a",
+    "all_components",
+    is_flag=True,
+    help="Download every component in the library",
+)
+@click.option(
+    "--match",
+    "-m",
+    "pattern",
+    type=str,
+    default=None,
+    help="Only download components whose id matches this glob pattern",
+)
+@click.option(
+    "--regex", is_flag=True, help="Treat the --match pattern as a regular expression"
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(1, None),
+    default=4,
+    show_default=True,
+    help="Number of components downloaded concurrently",
+)
+@click.argument("component_ids", nargs=-1, type=str)
+def download(
+    component_ids,
+    profile="default",
+    path=None,
+    force=False,
+    all_components=False,
+    pattern=None,
+    regex=False,
+    jobs=4,
+):
+    from wcm import _download
+
+    if len(component_ids) == 1 and not (all_components or pattern):
+        logging.info("Downloading component")
+        _download.download(
+            component_ids[0], profile=profile, download_path=path, overwrite=force
+        )
+        click.secho(f"Success", fg="green")
+        return
+
+    if not (component_ids or all_components or pattern):
+        raise click.UsageError("Give at least one COMPONENT_ID, --all or --match.")
+
+    results = _download.download_components(
+        component_ids,
+        profile=profile,
+        download_path=path,
+        overwrite=force,
+        all_components=all_components,
+        pattern=pattern,
+        regex=regex,
+        jobs=jobs,
+    )
+    _print_results(results, lambda r: r.id)
 
 
 @cli.command(help="Lists all the components in the current wings instance")
@@ -183,9 +625,84 @@ def download(component_id, profile="default", path=None, force=False):
     default="default",
     metavar="<profile-name>",
 )
-def list(profile="default"):
-    _list.list_components(profile=profile)
-    click.secho(f"Done", fg="green")
+@click.option(
+    "--tree", "fmt", flag_value="tree", default=True, help="Print a tree (default)"
+)
+@click.option(
+    "--json", "fmt", flag_value="json", help="Print a JSON array of component classes"
+)
+@click.option(
+    "--jsonl", "fmt", flag_value="jsonl", help="Print one JSON object per component"
+)
+@click.option(
+    "--count",
+    "-c",
+    "fmt",
+    flag_value="count",
+    help="Only print the number of components per class",
+)
+@click.option(
+    "--depth",
+    "-d",
+    type=click.IntRange(1, None),
+    default=None,
+    help="Levels of the tree to print",
+)
+@click.option(
+    "--limit",
+    "-l",
+    type=click.IntRange(1, None),
+    default=None,
+    help="Entries to print per level of the tree",
+)
+@click.option(
+    "--type",
+    "-t",
+    "type_pattern",
+    type=str,
+    default=None,
+    help="Only list classes matching this glob",
+)
+@click.option(
+    "--name",
+    "-n",
+    "name_pattern",
+    type=str,
+    default=None,
+    help="Only list ids matching this glob",
+)
+@click.option("--refresh", "-r", is_flag=True, help="Ignore the cached listing")
+@click.option(
+    "--ttl",
+    type=click.IntRange(0, None),
+    default=60,
+    show_default=True,
+    help="Seconds a cached listing stays valid",
+)
+def list(
+    profile="default",
+    fmt="tree",
+    type_pattern=None,
+    name_pattern=None,
+    refresh=False,
+    ttl=60,
+    depth=None,
+    limit=None,
+):
+    from wcm import _list
+
+    _list.list_components(
+        profile=profile,
+        fmt=fmt,
+        type_pattern=type_pattern,
+        name_pattern=name_pattern,
+        refresh=refresh,
+        ttl=ttl,
+        depth=depth,
+        limit=limit,
+    )
+    if fmt == "tree":
+        click.secho(f"Done", fg="green")
 
 
 @cli.command(help="Generates a blank YAML from the schema. Useful for creating a new component from scratch. Optional "
@@ -196,7 +713,26 @@ def list(profile="default"):
     type=str,
     default=None,
 )
-def make_yaml(file_path=None):
+@click.option(
+    "--section",
+    "-s",
+    type=str,
+    default=None,
+    help="Only outline part of the schema: a property path such as wings or "
+    "wings.requirement, or a definition such as #/definitions/ioData",
+)
+def make_yaml(file_path=None, section=None):
+    from wcm import _makeyaml
+
     logging.info("Generating blank YAML")
-    _makeyaml.make_yaml(download_path=file_path)
+    try:
+        _makeyaml.make_yaml(download_path=file_path, sub_path=section)
+    except KeyError:
+        raise click.BadParameter(
+            f"{section} is not part of the schema", param_hint="--section"
+        )
     click.secho(f"Done", fg="green")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Reproducible component code archives.
+
+Archives are written to a file object given by the caller, such as a temporary
+file, so nothing is written to the working directory. Entries are sorted and
+carry fixed timestamps, so identical sources always produce byte identical
+archives. Files are streamed into the archive, so memory use does not grow with
+their size.
+"""
+
+import os
+import shutil
+import zipfile
+from pathlib import Path
+
+# Default deflate level, from 0 (store) to 9 (smallest).
+COMPRESS_LEVEL = 6
+
+# Files that are already compressed and are stored rather than deflated.
+STORED_SUFFIXES = {
+    ".7z", ".bz2", ".gz", ".jar", ".jpeg", ".jpg", ".mp3", ".mp4", ".png",
+    ".tgz", ".whl", ".xz", ".zip", ".zst",
+}
+
+_EPOCH = (1980, 1, 1, 0, 0, 0)
+_CHUNK_SIZE = 1024 * 1024
+
+
+def _entries(root):
+    for dirpath, dirnames, filenames in os.walk(str(root)):
+        dirnames.sort()
+        rel = Path(dirpath).relative_to(root)
+        if rel.parts:
+            yield Path(dirpath), rel.as_posix() + "/"
+        for name in sorted(filenames):
+            yield Path(dirpath, name), (rel / name).as_posix()
+
+
+def _set_compresslevel(info, compresslevel):
+    # ZipFile.open() takes the level from the entry, where ZipFile.write() puts
+    # it. Python 3.13 made the attribute public.
+    if hasattr(zipfile.ZipInfo, "compress_level"):
+        info.compress_level = compresslevel
+    else:
+        info._compresslevel = compresslevel
+
+
+def write_archive(root, fh, compresslevel=None):
+    """Write a zip of every file and directory under ``root`` into ``fh``."""
+    compresslevel = COMPRESS_LEVEL if compresslevel is None else compresslevel
+    with zipfile.ZipFile(fh, "w") as zf:
+        for path, arcname in _entries(Path(root)):
+            stat = path.stat()
+            info = zipfile.ZipInfo(arcname, date_time=_EPOCH)
+            info.external_attr = (stat.st_mode & 0o170777) << 16
+
+            if arcname.endswith("/"):
+                info.external_attr |= 0x10  # MS-DOS directory flag
+                zf.writestr(info, b"")
+                continue
+
+            if compresslevel and path.suffix.lower() not in STORED_SUFFIXES:
+                info.compress_type = zipfile.ZIP_DEFLATED
+                _set_compresslevel(info, compresslevel)
+            info.file_size = stat.st_size
+            with path.open("rb") as src, zf.open(info, "w") as dst:
+                shutil.copyfileobj(src, dst, _CHUNK_SIZE)
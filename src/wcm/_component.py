@@ -2,37 +2,62 @@
 """Component Uploader."""
 
 import argparse
+import asyncio
+import copy
+import functools
+import hashlib
+import json
 import logging
 import os
-from contextlib import contextmanager
+import tempfile
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import ExitStack
 from pathlib import Path
-from shutil import make_archive
 
-import wings
 from semver import parse_version_info
-from yaml import load
 import click
 
-from wcm import _schema, _utils
-
-try:
-    from yaml import CLoader as Loader
-except ImportError:
-    from yaml import Loader
+from wcm import (
+    _archive, _datatypes, _diff, _engine, _list, _manifest, _schema, _session, _timing,
+    _upload, _utils, _yaml,
+)
 
 log = logging.getLogger()
 
-
-@contextmanager
-def _cli(**kw):
-    i = None
-    try:
-        log.debug("Initializing WINGS API Client")
-        i = wings.init(**kw)
-        yield i
-    finally:
-        if i:
-            i.close()
+# Concurrent data file uploads per component, and retries of a failed upload.
+UPLOAD_JOBS = 4
+UPLOAD_RETRIES = 3
+UPLOAD_RETRY_DELAY = 1.0
+
+# ``profile`` is the credentials profile the component was published with.
+PublishResult = namedtuple(
+    "PublishResult",
+    ["component_dir", "id", "status", "error", "profile"],
+    defaults=(None,),
+)
+
+# One server operation of a publish, ``bytes`` it sends and the sha256 ``digest`` of
+# uploaded content.
+Operation = namedtuple("Operation", ["name", "target", "bytes", "digest"])
+# Status is ``publish``, ``unchanged``, ``skipped`` or ``failed``.
+PublishPlan = namedtuple(
+    "PublishPlan",
+    ["component_dir", "id", "status", "operations", "error", "profile"],
+    defaults=(None,),
+)
+
+# HTTP requests made for each operation, uploads take one more per extra chunk.
+REQUESTS = {
+    "new_data_type": 1,
+    "add_type_properties": 2,
+    "upload_data": 3,
+    "new_component_type": 1,
+    "new_component": 1,
+    "save_component": 1,
+    "upload_component": 2,
+    "describe": 1,
+}
 
 
 def check_data_types(spec):
@@ -49,117 +74,793 @@ def check_data_types(spec):
                 log.warning(f"output data-type \"{dtype}\" not defined")
 
 
-def create_data_types(spec, component_dir, cli, ignore_data):
-    for dtype, _file in spec.get("data", {}).items():
+def _upload_data(cli, path, dtype, retries):
+    for attempt in range(retries + 1):
+        try:
+            with _timing.span("upload_data", file=path.name):
+                _upload.upload_data(cli, path, dtype)
+            return
+        except Exception as e:
+            err = e
+        if attempt < retries:
+            log.warning(f"Upload of {path} failed ({err}), retrying")
+            time.sleep(UPLOAD_RETRY_DELAY * 2 ** attempt)
+    raise err
+
+
+def create_data_type(cli, dtype, _file, known=None, properties=True):
+    """Create a data type, unless ``known`` lists it, and set its properties and format.
+
+    The properties and format are only set if they differ from what ``known`` has.
+    """
+    if known is None or not known.exists(dtype):
         cli.data.new_data_type(dtype, None)
-        if ignore_data:
-            continue
+        if known is not None:
+            known.created(dtype)
+    if not (properties and _file):
+        return
+
+    format = _file.get("format", None)
+    metadata_properties = _file.get("metadataProperties", {})
+    if metadata_properties or format:
+        if known is None or known.needs_properties(dtype, metadata_properties, format):
+            cli.data.add_type_properties(
+                dtype, properties=metadata_properties, format=format
+            )
+            if known is not None:
+                known.properties_set(dtype, metadata_properties, format)
+
+
+def _type_key(target, kind, name, declaration=None):
+    # Components of a run share the creation of a type on a server, data types
+    # only when they declare the same properties and format.
+    if declaration:
+        declaration = {k: v for k, v in declaration.items() if k != "files"}
+    return target, kind, name, json.dumps(declaration, sort_keys=True)
+
+
+def _data_uploads(spec, component_dir, files=None):
+    uploads = []
+    for dtype, _file in spec.get("data", {}).items():
+        for f in (_file or {}).get("files", ()):
+            if files is None or f in files:
+                uploads.append(((component_dir / Path(f)).resolve(), dtype))
+    return uploads
 
-        if _file:
-            # Properties
-            format = _file.get("format", None)
-            metadata_properties = _file.get("metadataProperties", {})
-            if metadata_properties or format:
-                cli.data.add_type_properties(
-                    dtype, properties=metadata_properties, format=format
-                )
 
-            # Files
-            for f in _file.get("files", ()):
-                cli.data.upload_data_for_type(
-                    (component_dir / Path(f)).resolve(), dtype
-                )
+def component_id(spec):
+    name = spec["name"]
+    version = spec["version"]
 
+    # _id = f"{name}-v{version}" #removed this line because it would make errors
+    # if 'v' was in version name
+    if version.isspace() or len(version) <= 0:
+        return name
+    return name + "-" + version
 
-def component_exists(spec, profile, overwrite, credentials):
+
+def component_exists(cli, _id, overwrite):
     """
-    :param spec: Component specification
-    :type spec: dict
-    :param profile: If we are using the cli, User profile with credentials required
-    :type profile: dict
+    :param cli: Authenticated WINGS API client, shared with the rest of the publish
+    :type cli: wings.ApiClient
+    :param _id: Component identifier
+    :type _id: str
     :param overwrite: Overwrite component
     :type overwrite: bool
-    :param credentials: If we are using the API, Credentials required
-    :type credentials: dict
-    :return: Boolean
-    :rtype: bool
+    :return: The remote component description, or None if the component does not exist
+    :rtype: dict
     """
-    with _cli(profile=profile, **credentials) as wi:
-        if spec["version"].isspace() or len(spec["version"]) <= 0:
-            name = spec["name"]
+    comps = cli.component.get_component_description(_id)
+    if comps is not None:
+        log.info("Component already exists on server")
+        if not overwrite:
+            log.error(
+                "Publishing this component would overwrite the existing one. "
+                "To force upload use flag -f"
+            )
+    return comps
+
+
+def load_spec(component_dir):
+    try:
+        return _yaml.load(component_dir / _schema.SPEC_FILES[0])
+    except FileNotFoundError:
+        return _yaml.load(component_dir / _schema.SPEC_FILES[1])
+
+
+def find_components(paths, recursive=False):
+    """Return the component directories in ``paths``, or found in them recursively."""
+    found = []
+    for path in paths:
+        path = Path(path)
+        if not recursive:
+            found.append(path)
+            continue
+
+        for spec_file in sorted(path.rglob("wings-component.y*ml")):
+            if spec_file.name in _schema.SPEC_FILES and spec_file.parent not in found:
+                found.append(spec_file.parent)
+    return found
+
+
+def upload_component(cli, fh, _id, fname=None, digest=None):
+    """Upload a component code archive from an open file object and set its location.
+
+    The archive is sent in chunks, resuming an interrupted upload of the same content.
+    """
+    cid = cli.component.get_component_id(_id)
+    # Chunks are assembled by file name, each component needs its own.
+    result = _upload.upload(cli, fh, fname or f"{_id}.zip", "component", digest, id=cid)
+    cli.component.set_component_location(cid, result.location)
+    return os.path.basename(result.location)
+
+
+def known_types(profile, cli, incremental):
+    """The server's data type cache for a session, None when ``--full`` resends all."""
+    return _datatypes.DataTypeCache(profile or "default", cli) if incremental else None
+
+
+class Artifacts:
+    """What a publish builds from a component directory, once for every target.
+
+    The hashes and the code archive are built on first use, the archive into a
+    temporary file that each upload opens on its own.
+    """
+
+    def __init__(self, component_dir, spec, compresslevel=None):
+        self.component_dir = Path(component_dir)
+        self.spec = spec
+        self.compresslevel = compresslevel
+        self.manifest = _manifest.Manifest(component_dir)
+        self.archive_path = None
+        self._tasks = {}
+
+    def _once(self, engine, name, fn, *args, key=None):
+        key = name if key is None else key
+        if key not in self._tasks:
+            timed = _timing.timed(name, fn, component=component_id(self.spec))
+            self._tasks[key] = asyncio.ensure_future(engine.work(timed, *args))
+        return self._tasks[key]
+
+    async def state(self, engine, files=True):
+        """Return the hashes of the component, a copy each target can change.
+
+        Without ``files`` the data files are left unread.
+        """
+        state = await self._once(
+            engine, "hash", _manifest.compute_state, self.component_dir, self.spec,
+            files, key=("hash", files),
+        )
+        return copy.deepcopy(state)
+
+    def archive(self, engine):
+        """Start building the code archive, a task giving its path, size and sha256."""
+        return self._once(engine, "make_archive", self._build_archive)
+
+    def _build_archive(self):
+        fd, path = tempfile.mkstemp(prefix="wcm-", suffix=".zip")
+        try:
+            with os.fdopen(fd, "w+b") as fh:
+                _archive.write_archive(
+                    self.component_dir / "src", fh, self.compresslevel
+                )
+                fh.seek(0)
+                digest = hashlib.sha256()
+                for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                    digest.update(chunk)
+                size = fh.tell()
+        except Exception:
+            os.unlink(path)
+            raise
+        self.archive_path = path
+        return path, size, digest.hexdigest()
+
+    async def wait(self):
+        """Wait for work started but not used, e.g. a skipped component's archive."""
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def close(self):
+        if self.archive_path is not None:
+            os.unlink(self.archive_path)
+            self.archive_path = None
+
+
+async def _plan(
+    engine,
+    component_dir,
+    cli,
+    spec,
+    artifacts,
+    ignore_data=False,
+    overwrite=None,
+    incremental=True,
+    known=None,
+    component_types=(),
+    data_types=(),
+):
+    """Work out what a publish of ``spec`` must send, fetching the remote description.
+
+    When the component already exists on the server and ``incremental`` is set,
+    only the parts that changed since the last successful publish to the same
+    server, as recorded in the component's manifest, are planned. With ``known``,
+    a :class:`wcm._datatypes.DataTypeCache`, data types the server already has
+    are not planned again, nor are the ``component_types`` and ``data_types``
+    known to exist.
+
+    The remote description is fetched first, so a component that is skipped
+    is neither hashed nor archived. Otherwise the component is hashed while its
+    code is archived, when the code is bound to be uploaded. Both are taken from
+    ``artifacts``, the :class:`Artifacts` of the component.
+
+    :return: The :class:`PublishPlan`, the remote description, and what executing
+        the plan needs (the manifest, its new state, the changed parts and the code
+        archive)
+    :rtype: tuple
+    """
+    _id = component_id(spec)
+    target = _session.target(cli)
+    manifest = artifacts.manifest
+    recorded = manifest.get(target) if incremental else None
+
+    exists = _timing.timed("exists", component_exists, component=_id)
+    remote = await engine.call(cli, exists, cli, _id, overwrite)
+    if remote is not None:
+        if overwrite:
+            log.info("Replacing the component")
         else:
-            name = spec["name"] + "-" + spec["version"]
+            log.info("Skipping publish")
+            return PublishPlan(component_dir, _id, "skipped", [], None), remote, None
+    else:
+        log.info("Component does not exist on server")
+
+    if remote is None or recorded is None:
+        artifacts.archive(engine)
+    state = await artifacts.state(engine, files=not ignore_data)
+    previous = recorded if remote is not None else None
+    todo = _manifest.changed(previous, state)
+
+    if ignore_data:
+        log.info("Upload data and metadata skipped")
+        # Nothing about the data was sent, remember what was sent last time.
+        state["dataTypes"] = (previous or {}).get("dataTypes")
+        state["files"] = (previous or {}).get("files", {})
+        todo["files"] = set()
+
+    if not (todo["spec"] or todo["dataTypes"] or todo["src"] or todo["files"]):
+        log.info("Component is unchanged since the last publish")
+        return PublishPlan(component_dir, _id, "unchanged", [], None), remote, None
+
+    # An existing component is only created again when the manifest shows its
+    # type changed, and only saved when its description differs from the spec.
+    wings_component = spec["wings"]
+    retyped = (
+        previous is not None and previous.get("componentType") != state["componentType"]
+    )
+    todo["create"] = todo["spec"] and (remote is None or retyped)
+    todo["createType"] = (
+        todo["create"] and wings_component["componentType"] not in component_types
+    )
+    todo["createDataTypes"] = [
+        dtype for dtype in wings_component.get("data", {})
+        if todo["dataTypes"] and dtype not in data_types
+    ]
+    todo["save"] = todo["create"]
+    if todo["spec"] and not todo["create"]:
+        with _timing.span("diff", component=_id):
+            todo["save"] = bool(_diff.diff(wings_component, remote))
+
+    work = {
+        "manifest": manifest,
+        "target": target,
+        "state": state,
+        "todo": todo,
+        "archive": None,
+    }
+    if not (todo["save"] or todo["dataTypes"] or todo["src"] or todo["files"]):
+        log.info("Component description matches the spec")
+        return PublishPlan(component_dir, _id, "unchanged", [], None), remote, work
+
+    archive_task = artifacts.archive(engine) if todo["src"] else None
+
+    # Mirrors create_data_type and the rest of _execute, asking the server
+    # about each data type while the code is archived. Types other components
+    # of the run also use are only planned for the first of them.
+    async def data_operations(dtype, _file):
+        ops = []
+        create = dtype in todo["createDataTypes"] and engine.claim(
+            _type_key(target, "dataType", dtype, _file)
+        )
+        if create:
+            exists = known is not None and await engine.call(cli, known.exists, dtype)
+            if not exists:
+                ops.append(Operation("new_data_type", dtype, 0, None))
+        if ignore_data or not _file:
+            return ops
+        properties, format = _file.get("metadataProperties"), _file.get("format")
+        if create and (properties or format):
+            needed = known is None or await engine.call(
+                cli, known.needs_properties, dtype, properties, format
+            )
+            if needed:
+                ops.append(Operation("add_type_properties", dtype, 0, None))
+        for f in _file.get("files", ()):
+            if f in todo["files"]:
+                size = (Path(component_dir) / f).stat().st_size
+                ops.append(Operation("upload_data", f, size, state["files"][f]))
+        return ops
+
+    operations = []
+    if todo["dataTypes"] or todo["files"]:
+        data = wings_component.get("data", {}).items()
+        for ops in await asyncio.gather(*(data_operations(*d) for d in data)):
+            operations.extend(ops)
+
+    ctype = wings_component["componentType"]
+    if todo["createType"] and engine.claim(_type_key(target, "componentType", ctype)):
+        operations.append(Operation("new_component_type", ctype, 0, None))
+    if todo["create"]:
+        operations.append(Operation("new_component", _id, 0, None))
+    if todo["save"]:
+        operations.append(
+            Operation("save_component", _id, len(json.dumps(wings_component)), None)
+        )
+
+    if archive_task is not None:
+        work["archive"], size, work["digest"] = await archive_task
+        operations.append(Operation("upload_component", "src", size, work["digest"]))
+
+    operations.append(Operation("describe", _id, 0, None))
+    return PublishPlan(component_dir, _id, "publish", operations, None), remote, work
+
+
+async def _execute(
+    engine,
+    component_dir,
+    cli,
+    spec,
+    _id,
+    work,
+    ignore_data=False,
+    upload_jobs=None,
+    known=None,
+):
+    """Send what :func:`_plan` found to be needed and record it in the manifest.
+
+    The data files are uploaded while the component is created, saved and its
+    code uploaded. Saving waits for the data types its inputs and outputs use.
+    """
+    todo = work["todo"]
+    wings_component = spec["wings"]
+    log.debug("Check component's data-types")
+    with _timing.span("check_data_types", component=_id):
+        check_data_types(wings_component)
+    types_ready = asyncio.Event()
+
+    async def data():
+        if todo["createDataTypes"]:
+            log.debug("Create component's data-types")
+            create = _timing.timed("create_data_types", create_data_type, component=_id)
+            data_types = wings_component.get("data", {})
+            await asyncio.gather(*(
+                engine.once(
+                    _type_key(work["target"], "dataType", d, data_types[d]),
+                    functools.partial(
+                        engine.call, cli, create, cli, d, data_types[d], known,
+                        not ignore_data,
+                    ),
+                )
+                for d in data_types
+                if d in todo["createDataTypes"]
+            ))
+        types_ready.set()
+        if todo["files"] and not ignore_data:
+            jobs = UPLOAD_JOBS if upload_jobs is None else upload_jobs
+            limit = asyncio.Semaphore(jobs)
+            uploads = _data_uploads(wings_component, component_dir, todo["files"])
+
+            def send(path, dtype):
+                call = engine.call(cli, _upload_data, cli, path, dtype, UPLOAD_RETRIES)
+                return _engine.limited(limit, call)
+
+            pending = [send(path, dtype) for path, dtype in uploads]
+            for done, upload in enumerate(asyncio.as_completed(pending), 1):
+                await upload
+                log.info(f"Uploaded data file {done}/{len(uploads)}")
+
+    async def component():
+        if todo["createType"]:
+            log.debug("Create component's type")
+            ctype = wings_component["componentType"]
+            new_type = _timing.timed(
+                "new_component_type", cli.component.new_component_type, component=_id
+            )
+            await engine.once(
+                _type_key(work["target"], "componentType", ctype),
+                functools.partial(engine.call, cli, new_type, ctype, None),
+            )
+        if todo["create"]:
+            log.debug("Create the component")
+            await engine.call(
+                cli,
+                _timing.timed(
+                    "new_component", cli.component.new_component, component=_id
+                ),
+                _id,
+                wings_component["componentType"],
+            )
+
+        if todo["save"]:
+            await types_ready.wait()
+            log.debug("Create component's I/O, Documentation, etc.")
+            # wings expands the spec in place to the server's namespaces, and the
+            # spec is shared by every target: each save gets its own copy.
+            await engine.call(
+                cli,
+                _timing.timed(
+                    "save_component", cli.component.save_component, component=_id
+                ),
+                _id,
+                copy.deepcopy(wings_component),
+            )
+
+        if work["archive"] is not None:
+            log.debug("Upload component code")
+            with open(work["archive"], "rb") as fh:
+                upload = _timing.timed(
+                    "upload_component", upload_component, component=_id
+                )
+                await engine.call(cli, upload, cli, fh, _id, digest=work["digest"])
+
+    await asyncio.gather(data(), component())
+    work["manifest"].update(work["target"], work["state"])
+    return await engine.call(
+        cli,
+        _timing.timed(
+            "describe", cli.component.get_component_description, component=_id
+        ),
+        _id,
+    )
 
-        comps = wi.component.get_component_description(name)
-        if comps is not None:
-            log.info("Component already exists on server")
-            if not overwrite:
-                log.error("Publishing this component would overwrite the existing one. To force upload use flag -f")
-            return True
-        return False
 
+async def publish_component(
+    engine, component_dir, cli, spec, artifacts, ignore_data=False, overwrite=None,
+    incremental=True, upload_jobs=None, known=None, component_types=(), data_types=(),
+):
+    """Publish a validated component using an authenticated client.
 
-def deploy_component(component_dir, profile=None, creds={}, debug=False, dry_run=False, ignore_data=False, overwrite=None):
-    component_dir = Path(component_dir)
-    if not component_dir.exists():
-        raise ValueError("Component directory does not exist.")
+    :return: A ``(status, description)`` tuple, where status is ``published``,
+        ``unchanged`` or ``skipped``
+    :rtype: tuple
+    """
+    with _timing.span("publish", component=component_id(spec)):
+        plan, remote, work = await _plan(
+            engine, component_dir, cli, spec, artifacts, ignore_data, overwrite,
+            incremental, known, component_types, data_types,
+        )
+        if plan.status != "publish":
+            if work is not None:
+                work["manifest"].update(work["target"], work["state"])
+            return plan.status, remote
+        return "published", await _execute(
+            engine, component_dir, cli, spec, plan.id, work, ignore_data, upload_jobs,
+            known,
+        )
+
+
+def validate_all(component_dirs):
+    """Return the valid specs by component directory, and the errors of the others."""
+    specs, errors = {}, {}
+    for component_dir in component_dirs:
+        try:
+            with _timing.span("validate", component=Path(component_dir).name):
+                specs[component_dir] = _load_valid_spec(component_dir)
+        except Exception as err:
+            log.error(f"{component_dir}: {err}")
+            errors[component_dir] = err
+    return specs, errors
+
+
+def _for_each_target(specs, profiles, creds, jobs, incremental, compresslevel, run_one):
+    """Run ``run_one`` for every component on every profile, one session per profile.
+
+    Each component is hashed and archived once for all the profiles. Profiles
+    are served concurrently, each with at most ``jobs`` components in progress.
+    ``run_one(engine, profile, component_dir, cli, artifacts, known)`` is a coroutine
+    function.
+
+    :return: The result of ``run_one`` by ``(profile, component_dir)``
+    :rtype: dict
+    """
+    artifacts = {d: Artifacts(d, spec, compresslevel) for d, spec in specs.items()}
+    with ExitStack() as stack:
+        clients = {
+            p: stack.enter_context(
+                _session.client(
+                    profile=p, pool_size=_engine.SERVER_CONCURRENCY, **creds
+                )
+            )
+            for p in profiles
+        }
+        known = {p: known_types(p, cli, incremental) for p, cli in clients.items()}
+
+        async def run_all(engine):
+            limits = {p: asyncio.Semaphore(jobs) for p in profiles}
+            keys = [(p, d) for p in profiles for d in specs]
+
+            def start(p, d):
+                return run_one(engine, p, d, clients[p], artifacts[d], known[p])
+
+            results = await asyncio.gather(
+                *(_engine.limited(limits[p], start(p, d)) for p, d in keys)
+            )
+            await asyncio.gather(*(a.wait() for a in artifacts.values()))
+            return dict(zip(keys, results))
 
-    with _cli(profile=profile, **creds) as cli:
         try:
-            spec = load((component_dir / "wings-component.yml").open(), Loader=Loader)
-        except FileNotFoundError:
-            spec = load((component_dir / "wings-component.yaml").open(), Loader=Loader)
+            return _engine.run(run_all)
+        finally:
+            for a in artifacts.values():
+                a.close()
+
+
+def plan_components(
+    component_dirs,
+    profile=None,
+    creds={},
+    jobs=4,
+    ignore_data=False,
+    overwrite=None,
+    incremental=True,
+    compresslevel=None,
+    profiles=None,
+):
+    """Plan the publish of many components without changing anything on the server.
+
+    Each spec is validated and its code archived to measure it, and each remote
+    description is fetched once.
+
+    :param profiles: Plan the publish to each of these profiles, instead of ``profile``
+    :return: A :class:`PublishPlan` per component and profile, in the order of
+        ``profiles`` then ``component_dirs``
+    :rtype: list
+    """
+    profiles = profiles or [profile]
+    specs, errors = validate_all(component_dirs)
 
+    async def plan_one(engine, profile, component_dir, cli, artifacts, known):
+        spec = specs[component_dir]
         try:
-            _schema.check_package_spec(spec)
-        except ValueError as err:
-            log.error(err)
-            exit(1)
+            plan, _, _ = await _plan(
+                engine, Path(component_dir), cli, spec, artifacts, ignore_data,
+                overwrite, incremental, known,
+            )
+            return plan._replace(profile=profile)
+        except Exception as err:
+            log.error(f"{component_dir}: {err}")
+            return PublishPlan(
+                component_dir, component_id(spec), "failed", [], err, profile
+            )
+
+    plans = {
+        (p, d): PublishPlan(d, None, "failed", [], err, p)
+        for d, err in errors.items()
+        for p in profiles
+    }
+    if specs:
+        plans.update(
+            _for_each_target(
+                specs, profiles, creds, jobs, incremental, compresslevel, plan_one
+            )
+        )
+    return [plans[p, d] for p in profiles for d in component_dirs]
+
+
+def format_size(n):
+    for unit in ("B", "KiB", "MiB"):
+        if n < 1024 or unit == "MiB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def format_plan(plan):
+    """Return the lines describing a :class:`PublishPlan`."""
+    lines = [
+        f"{plan.status:<10} {plan.component_dir} ({plan.id or '-'})"
+        + (f": {plan.error}" if plan.error else "")
+    ]
+    for op in plan.operations:
+        size = format_size(op.bytes) if op.bytes else ""
+        digest = f"sha256:{op.digest[:16]}" if op.digest else ""
+        lines.append(f"  {op.name:<20} {op.target:<32} {size:>10}  {digest}".rstrip())
+    if plan.operations:
+        lines.append(
+            f"  {plan_requests(plan)} requests, {format_size(plan_bytes(plan))}"
+        )
+    return lines
+
+
+def plan_requests(plan):
+    return sum(
+        REQUESTS[op.name]
+        + (_upload.chunks(op.bytes) - 1 if op.name.startswith("upload") else 0)
+        for op in plan.operations
+    )
 
-        name = spec["name"]
-        version = spec["version"]
 
-        # _id = f"{name}-v{version}" #removed this line because it would make errors if 'v' was in version name
-        if version.isspace() or len(version) <= 0:
-            log.warning("No version. Component will be uploaded with no version identifier")
-            _id = name
-        else:
-            _id = name + "-" + version
-
-        if component_exists(spec, profile, overwrite, creds):
-            if overwrite:
-                log.info("Replacing the component")
-            else:
-                log.info("Skipping publish")
-                return cli.component.get_component_description(_id)
-        else:
-            log.info("Component does not exist, deploying the component")
+def plan_bytes(plan):
+    return sum(op.bytes for op in plan.operations)
 
-        if ignore_data:
-            log.info("Upload data and metadata skipped")
 
-        wings_component = spec["wings"]
-        log.debug("Check component's data-types")
-        check_data_types(wings_component)
-        log.debug("Create component's data-types")
-        create_data_types(wings_component, component_dir, cli, ignore_data)
+def _load_valid_spec(component_dir):
+    component_dir = Path(component_dir)
+    if not component_dir.exists():
+        raise ValueError("Component directory does not exist.")
+
+    spec = load_spec(component_dir)
+    _schema.check_package_spec(spec)
 
-        log.debug("Create component's type")
-        cli.component.new_component_type(wings_component["componentType"], None)
+    if component_id(spec) == spec["name"]:
+        log.warning("No version. Component will be uploaded with no version identifier")
+    return spec
 
-        log.debug("Create the component")
-        cli.component.new_component(_id, wings_component["componentType"])
 
-        log.debug("Create component's I/O, Documentation, etc.")
-        cli.component.save_component(_id, wings_component)
+def diff_component(component_dir, profile=None, creds={}):
+    """Compare a component's spec with its description on the server.
 
+    :return: The component id, and the list of :class:`wcm._diff.Change`, or None
+        if the component does not exist on the server
+    :rtype: tuple
+    """
+    spec = _load_valid_spec(component_dir)
+    _id = component_id(spec)
+    with _session.client(profile=profile, **creds) as cli:
+        with _timing.span("describe", component=_id):
+            remote = cli.component.get_component_description(_id)
+    if remote is None:
+        return _id, None
+    return _id, _diff.diff(spec["wings"], remote)
+
+
+def deploy_component(
+    component_dir,
+    profile=None,
+    creds={},
+    debug=False,
+    dry_run=False,
+    ignore_data=False,
+    overwrite=None,
+    incremental=True,
+    compresslevel=None,
+    upload_jobs=None,
+):
+    component_dir = Path(component_dir)
+    if dry_run:
+        [plan] = plan_components(
+            [component_dir],
+            profile=profile,
+            creds=creds,
+            ignore_data=ignore_data,
+            overwrite=overwrite,
+            incremental=incremental,
+            compresslevel=compresslevel,
+        )
+        for line in format_plan(plan):
+            click.echo(line)
+        if plan.status == "failed":
+            exit(1)
+        return None
+
+    try:
+        with _timing.span("validate", component=component_dir.name):
+            spec = _load_valid_spec(component_dir)
+    except ValueError as err:
+        log.error(err)
+        exit(1)
+
+    artifacts = Artifacts(component_dir, spec, compresslevel)
+
+    async def run(engine):
         try:
-            _c = make_archive("_c", "zip", component_dir / "src")
-            log.debug("Upload component code")
-            cli.component.upload_component(_c, _id)
-            return cli.component.get_component_description(_id)
+            return await publish_component(
+                engine, component_dir, cli, spec, artifacts, ignore_data=ignore_data,
+                overwrite=overwrite, incremental=incremental, upload_jobs=upload_jobs,
+                known=known,
+            )
         finally:
-            os.remove(_c)
+            await artifacts.wait()
+
+    with _session.client(
+        profile=profile, pool_size=_engine.SERVER_CONCURRENCY, **creds
+    ) as cli:
+        known = known_types(profile, cli, incremental)
+        try:
+            status, description = _engine.run(run)
+        except Exception:
+            if known is not None:
+                known.invalidate()
+            raise
+        finally:
+            artifacts.close()
+    if status == "published":
+        _list.invalidate_cache(profile or "default")
+    return description
+
+
+def deploy_components(
+    component_dirs,
+    profile=None,
+    creds={},
+    jobs=4,
+    ignore_data=False,
+    overwrite=None,
+    incremental=True,
+    compresslevel=None,
+    upload_jobs=None,
+    profiles=None,
+):
+    """Publish many components concurrently over one authenticated session per profile.
+
+    At most ``jobs`` components are in progress at once per profile, and their
+    requests share the server's ``SERVER_CONCURRENCY`` limit. With ``profiles``,
+    every component is validated, hashed and archived once and then published
+    to each of those profiles concurrently.
+
+    :return: A :class:`PublishResult` per component and profile, in the order of
+        ``profiles`` then ``component_dirs``
+    :rtype: list
+    """
+    profiles = profiles or [profile]
+    specs, errors = validate_all(component_dirs)
+
+    async def publish_one(engine, profile, component_dir, cli, artifacts, known):
+        spec = specs[component_dir]
+        try:
+            status, _ = await publish_component(
+                engine, Path(component_dir), cli, spec, artifacts, ignore_data,
+                overwrite, incremental, upload_jobs, known,
+            )
+            return PublishResult(
+                component_dir, component_id(spec), status, None, profile
+            )
+        except Exception as err:
+            log.error(f"{component_dir}: {err}")
+            # A type the cache lists may be why the publish failed, list them again
+            # next time.
+            if known is not None:
+                known.invalidate()
+            return PublishResult(
+                component_dir, component_id(spec), "failed", err, profile
+            )
+
+    results = {
+        (p, d): PublishResult(d, None, "failed", err, p)
+        for d, err in errors.items()
+        for p in profiles
+    }
+    if specs:
+        results.update(
+            _for_each_target(
+                specs, profiles, creds, jobs, incremental, compresslevel, publish_one
+            )
+        )
+
+    for p in profiles:
+        if any(r.status == "published" for (rp, _), r in results.items() if rp == p):
+            _list.invalidate_cache(p or "default")
+    return [results[p, d] for p in profiles for d in component_dirs]
+
+
+def format_targets(results):
+    """Return the lines of a table counting result statuses per profile."""
+    statuses = ("published", "unchanged", "skipped", "failed")
+    counts = OrderedDict()
+    for r in results:
+        profile = r.profile or "default"
+        counts.setdefault(profile, dict.fromkeys(statuses, 0))[r.status] += 1
+    lines = [f"{'profile':<20}" + "".join(f"{s:>11}" for s in statuses)]
+    for profile, row in counts.items():
+        lines.append(f"{profile:<20}" + "".join(f"{row[s]:>11}" for s in statuses))
+    return lines
 
 
 def _main():
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""Data types known to exist on a WINGS server.
+
+Many components declare the same data types. Rather than creating every type
+and setting its properties on each publish, the types of the server are listed
+once per session and cached per profile under ``~/.wcm/cache/datatypes``. Types
+and properties set by ``wcm`` are added to the cache as they are sent, and the
+cache is dropped after ``DATATYPE_CACHE_TTL`` seconds or a failed publish.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from wcm import _session, _utils
+
+log = logging.getLogger()
+
+# Seconds a cached listing of the server's data types stays valid.
+DATATYPE_CACHE_TTL = 10 * 60
+
+
+def _short(type_id):
+    return type_id.split("#")[-1]
+
+
+def _type_ids(node):
+    """Yield the ids of the data types in a ``data.get_all_items()`` tree."""
+    item = node.get("item") or {}
+    if item.get("type") == 1 and item.get("id"):
+        yield item["id"]
+    for child in node.get("children") or ():
+        yield from _type_ids(child)
+
+
+class DataTypeCache:
+    """The data types of the server a client talks to, shared across a session."""
+
+    def __init__(self, profile, cli, ttl=None):
+        self.path = _utils.get_cache_dir("datatypes") / f"{profile}.json"
+        self.target = _session.target(cli)
+        self.cli = cli
+        self.ttl = DATATYPE_CACHE_TTL if ttl is None else ttl
+        self._lock = threading.RLock()
+        self._types = None
+
+    def _load(self):
+        with self._lock:
+            if self._types is not None:
+                return self._types
+            try:
+                with self.path.open() as fh:
+                    cached = json.load(fh)
+                if (
+                    cached["target"] == self.target
+                    and time.time() - cached["fetched"] <= self.ttl
+                ):
+                    log.debug("Using cached data types")
+                    self._types = cached["types"]
+                    self._fetched = cached["fetched"]
+                    return self._types
+            except (OSError, ValueError, KeyError):
+                pass
+
+            log.debug("Listing the server's data types")
+            tree = self.cli.data.get_all_items() or {}
+            self._types = {_short(t): {} for t in _type_ids(tree)}
+            self._fetched = time.time()
+            self._save()
+            return self._types
+
+    def _save(self):
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("w") as fh:
+            json.dump(
+                {"target": self.target, "fetched": self._fetched, "types": self._types},
+                fh,
+            )
+        os.replace(str(tmp_path), str(self.path))
+
+    def exists(self, dtype):
+        return dtype in self._load()
+
+    def needs_properties(self, dtype, properties=None, format=None):
+        """Tell whether ``dtype`` lacks the given format or metadata properties.
+
+        ``properties`` maps property names to XSD types.
+        """
+        properties = properties or {}
+        with self._lock:
+            known = self._load().get(dtype)
+            if known is None:
+                return True
+            if "properties" not in known:
+                description = self.cli.data.get_datatype_description(dtype) or {}
+                known["properties"] = {
+                    _short(p["id"]): _short(p["range"])
+                    for p in description.get("properties", ())
+                }
+                # The portal names the format ``name_format``.
+                known["format"] = description.get(
+                    "format", description.get("name_format")
+                )
+                self._save()
+        reformatted = format is not None and known["format"] != format
+        return known["properties"] != properties or reformatted
+
+    def created(self, dtype):
+        with self._lock:
+            self._load().setdefault(dtype, {"properties": {}, "format": None})
+            self._save()
+
+    def properties_set(self, dtype, properties=None, format=None):
+        with self._lock:
+            self._load()[dtype] = {
+                "properties": dict(properties or {}),
+                "format": format,
+            }
+            self._save()
+
+    def invalidate(self):
+        with self._lock:
+            self._types = None
+            invalidate_cache(path=self.path)
+
+
+def invalidate_cache(profile="default", path=None):
+    try:
+        (path or _utils.get_cache_dir("datatypes") / f"{profile}.json").unlink()
+    except FileNotFoundError:
+        pass
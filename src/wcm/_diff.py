@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Field by field comparison of a component spec with its description on a WINGS server.
+
+The remote description is normalised the way ``wcm download`` writes it, so a
+component that was just downloaded compares equal to the server. Inputs and
+outputs are matched by role, so reordering them is not a change.
+"""
+
+import copy
+from collections import namedtuple
+
+from wcm._download import normalize_description
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+# Parts of the ``wings`` block that are not part of the component description.
+LOCAL_ONLY = ("componentType", "data", "files")
+
+# ``path`` is e.g. ``documentation`` or ``inputs[role].type``, a missing side is None.
+Change = namedtuple("Change", ["path", "local", "remote"])
+
+
+def _local_io(io):
+    io = dict(io)
+    io.pop("id", None)
+    if isinstance(io.get("type"), str) and io["type"].startswith("xsd:"):
+        io["type"] = XSD + io["type"][4:]
+    return io
+
+
+def _diff_io(key, local, remote):
+    local = {io["role"]: _local_io(io) for io in local or ()}
+    remote = {io["role"]: io for io in remote or ()}
+    changes = []
+    for role in list(local) + [r for r in remote if r not in local]:
+        path = f"{key}[{role}]"
+        if role not in remote:
+            changes.append(Change(path, local[role], None))
+        elif role not in local:
+            changes.append(Change(path, None, remote[role]))
+        else:
+            for field in sorted(set(local[role]) | set(remote[role])):
+                ours, theirs = local[role].get(field), remote[role].get(field)
+                if ours != theirs:
+                    changes.append(Change(f"{path}.{field}", ours, theirs))
+    return changes
+
+
+def diff(wings_component, remote):
+    """Return the :class:`Change` list between a ``wings`` block and a description.
+
+    Only the fields a publish sends are compared.
+    """
+    remote = copy.deepcopy(remote)
+    remote.setdefault("inputs", [])
+    remote.setdefault("outputs", [])
+    normalize_description(remote)
+
+    changes = []
+    for key, value in wings_component.items():
+        if key in LOCAL_ONLY:
+            continue
+        if key in ("inputs", "outputs"):
+            changes.extend(_diff_io(key, value, remote.get(key)))
+            continue
+        if key == "documentation" and isinstance(value, str):
+            value = value.strip()
+        if value != remote.get(key):
+            changes.append(Change(key, value, remote.get(key)))
+    return changes
+
+
+def format_change(change):
+    if change.remote is None:
+        return f"+ {change.path}: {change.local!r}"
+    if change.local is None:
+        return f"- {change.path}: {change.remote!r}"
+    return f"~ {change.path}: {change.remote!r} -> {change.local!r}"
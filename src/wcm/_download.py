@@ -1,183 +1,363 @@
 import argparse
-import concurrent.futures
+import asyncio
 import configparser
-from contextlib import contextmanager
-import yaml
+import fnmatch
+import re
+from collections import namedtuple
 import logging
 import json
-import wings
 import click
 import os
 import zipfile
 import shutil
-from wcm import _schema, _utils
+from tempfile import SpooledTemporaryFile
+from wcm import _engine, _list, _schema, _session, _timing, _utils, _yaml
 
 logger = logging.getLogger()
 
+DownloadResult = namedtuple("DownloadResult", ["id", "status", "error"])
 
-@contextmanager
-def _cli(**kw):
-    i = None
-    try:
-        logger.debug("Initializing WINGS API Client")
-        i = wings.init(**kw)
-        yield i
-    finally:
-        if i:
-            i.close()
-
-
-def download(component_dir, profile=None, download_path=None, overwrite=False):
+# Downloaded archives are kept in memory up to this size before spilling to disk.
+SPOOL_SIZE = 16 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
 
-    comp_id = component_dir
 
-    # sets path, this determines where the component will be downloaded. Default is the current directory of the program
-    if download_path is None:
-        path = os.getcwd()
+def fetch_component(wings_instance, comp_id):
+    """Stream the code archive of a component into a spooled temporary file."""
+    resp = wings_instance.session.get(
+        wings_instance.get_request_url() + "components/fetch",
+        params={"cid": wings_instance.component.get_component_id(comp_id)},
+        stream=True,
+    )
+    wings_instance.check_request(resp)
+
+    archive = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    for chunk in resp.iter_content(CHUNK_SIZE):
+        archive.write(chunk)
+    archive.seek(0)
+    return archive
+
+
+def extract_source(archive, comp_id, dest):
+    """Extract a component archive into ``dest`` in one pass, keeping its structure.
+
+    WINGS nests the code under a ``<comp_id>/`` folder, which is stripped.
+    """
+    dest = os.path.realpath(dest)
+    with zipfile.ZipFile(archive) as zf:
+        for info in zf.infolist():
+            name = info.filename.split("/", 1)
+            if len(name) == 2 and name[0] == comp_id:
+                name = name[1]
+            else:
+                name = info.filename
+            target = os.path.realpath(os.path.join(dest, name))
+            if not name or target == dest:
+                continue
+            if not target.startswith(dest + os.sep):
+                logger.warning(f'Skipping "{info.filename}" outside of the component')
+                continue
+
+            if info.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with zf.open(info) as src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            mode = (info.external_attr >> 16) & 0o777
+            if mode:
+                os.chmod(target, mode)
+
+
+def normalize_description(component):
+    """Turn a WINGS component description into the ``wings`` block of a spec, in place.
+
+    Server side identifiers are dropped and the data types of inputs and
+    outputs are shortened to ``dcdom:<type>``.
+
+    :return: The data types used by the inputs and outputs, each with no files
+    :rtype: dict
+    """
+    data_types = {}
+    try:
+        component.pop("location")
+        component.pop("id")
+        component.pop("type")
+        component["documentation"] = component["documentation"].strip()
+    except KeyError:
+        logger.warning("Component seems to be missing metadata")
+
+    # loops through every input field
+    if len(component["inputs"]) <= 0:
+        logger.warning("Component has no inputs")
+    for i in (component["inputs"]):
+        files = {}
+        i.pop("id")
+        try:
+            if "XMLSchema" not in (i["type"]):
+                type_name = i["type"].split("#")
+                type_name = type_name[len(type_name) - 1]
+
+                i["type"] = "dcdom:" + type_name
+                files["files"] = []
+                data_types[type_name] = files
+        except:
+            logger.warning("no type in " + str(i))
+
+    if len(component["outputs"]) <= 0:
+        logger.warning("Component has no outputs")
+    for o in (component["outputs"]):
+        files = {}
+        o.pop("id")
+        try:
+            if "XMLSchema" not in o["type"]:
+                type_name = o["type"].split("#")
+                type_name = type_name[len(type_name) - 1]
+
+                o["type"] = "dcdom:" + type_name
+                files["files"] = []
+                data_types[type_name] = files
+        except:
+            logger.warning("no type in " + str(o))
+
+    return data_types
+
+
+async def _download(engine, wings_instance, comp_id, path, overwrite=False):
+    """Download a component into ``<path>/<comp_id>`` using an authenticated client.
+
+    The description and the code archive are fetched together, then the spec
+    is written while the code is extracted.
+
+    :return: ``downloaded``, or ``skipped`` if the directory exists and ``overwrite``
+        is not set
+    :rtype: str
+    """
+    with _timing.span("download", component=comp_id):
+        return await _download_phases(engine, wings_instance, comp_id, path, overwrite)
+
+
+async def _download_phases(engine, wings_instance, comp_id, path, overwrite):
+    # Make new folder to put everything in
+    path = os.path.join(path, comp_id)
+
+    # Checks if file already exists
+    if os.path.exists(path):
+        logger.info("\"" + path + "\" already exists")
+        if not overwrite:
+            logger.error("Downloading this component would overwrite the existing one. "
+                         "To force download use flag -f")
+            return "skipped"
+
+    component, archive = await asyncio.gather(
+        engine.call(
+            wings_instance,
+            _timing.timed(
+                "describe",
+                wings_instance.component.get_component_description,
+                component=comp_id,
+            ),
+            comp_id,
+        ),
+        engine.call(
+            wings_instance,
+            _timing.timed("fetch", fetch_component, component=comp_id),
+            wings_instance,
+            comp_id,
+        ),
+        return_exceptions=True,
+    )
+    if not isinstance(archive, BaseException) and (
+        component is None or isinstance(component, BaseException)
+    ):
+        archive.close()
+    if isinstance(component, BaseException):
+        raise component
+    if component is None:
+        raise ValueError("Invalid ID: \"" + comp_id + "\"")
+    if isinstance(archive, BaseException):
+        raise archive
+
+    if os.path.exists(path):
+        logger.info("Overwriting existing file")
+        shutil.rmtree(path)
+    os.mkdir(path)
+
+    yaml_data = {}
+
+    yaml_data["name"] = ""
+    yaml_data["version"] = ""
+    # yaml_data["#description"] = None
+    # yaml_data["#keywords"] = None
+    # yaml_data["homepage"] = None
+    # amlData["license"] = None
+    # yaml_data["author"] = None
+    # yaml_data["container"] = None
+    # yaml_data["repository"] = None
+    yaml_data["schemaVersion"] = _schema.get_schema_version();
+    yaml_data["wings"] = component
+    component = yaml_data["wings"]
+
+    # takes the id and splits it by the '#' sign
+    # (id example:
+    # http://localhost:8080/export/users/mint/api-test/components/library.owl#HAND-1)
+    info = component["id"].split("#")
+    info = info[len(info) - 1]  # gets the last index of the split (ie: HAND-1)
+    info = info.split("-")  # splits it by the '-' (ie {"HAND","1"})
+
+    # First part becomes name, other becomes version
+    yaml_data["name"] = info[0]
+    if len(info) > 1:
+        yaml_data["version"] = info[-1]
     else:
-        path = download_path
+        logger.warning("No version could be ascertained from the name")
 
-    with _cli(profile=profile) as wings_instance:
-        component = wings_instance.component.get_component_description(comp_id)
+    data_types = normalize_description(component)
+    component["files"] = ["src\\*"]
+    component["data"] = data_types
 
-        if component is None:
-            logger.error("Invalid ID: \"" + comp_id + "\"")
-            exit(1)
+    # makes the src folder in the directory
+    try:
+        os.mkdir(os.path.join(path, "src"))
+    except FileExistsError:
+        logger.warning("src folder already exists")
 
-        # Make new folder to put everything in
-        path = os.path.join(path, comp_id)
+    data_path = os.path.join(path, "data")
 
-        # Checks if file already exists
-        if os.path.exists(path):
-            logger.info("\"" + path + "\" already exists")
-            if overwrite:
-                logger.info("Overwriting existing file")
-                shutil.rmtree(path)
-            else:
-                logger.error("Downloading this component would overwrite the existing one. "
-                             "To force download use flag -f")
-                logger.info("Aborting Download")
-                exit(0)
-
-        os.mkdir(path)
-
-        wings_instance.component.download_component(comp_id, os.path.join(path, "components"))
-
-        yaml_data = {}
-        data_types = {}
-
-        yaml_data["name"] = ""
-        yaml_data["version"] = ""
-        # yaml_data["#description"] = None
-        # yaml_data["#keywords"] = None
-        # yaml_data["homepage"] = None
-        # amlData["license"] = None
-        # yaml_data["author"] = None
-        # yaml_data["container"] = None
-        # yaml_data["repository"] = None
-        yaml_data["schemaVersion"] = _schema.get_schema_version();
-        yaml_data["wings"] = component
-        component = yaml_data["wings"]
-
-        # takes the id and splits it by the '#' sign
-        # (id example: http://localhost:8080/export/users/mint/api-test/components/library.owl#HAND-1)
-        info = component["id"].split("#")
-        info = info[len(info) - 1]  # gets the last index of the split (ie: HAND-1)
-        info = info.split("-")  # splits it by the '-' (ie {"HAND","1"})
-
-        # First part becomes name, other becomes version
-        yaml_data["name"] = info[0]
-        if len(info) > 1:
-            yaml_data["version"] = info[-1]
-        else:
-            logger.warning("No version could be ascertained from the name")
+    try:
+        os.mkdir(data_path)
+    except FileExistsError:
+        logger.warning("data folder already exists")
+
+    logger.info("Extracting source code")
+    with archive:
+        await asyncio.gather(
+            engine.work(
+                _timing.timed("write_spec", _write_spec, component=comp_id),
+                yaml_data,
+                path,
+            ),
+            engine.work(
+                _timing.timed("extract", _extract, component=comp_id),
+                archive,
+                comp_id,
+                path,
+            ),
+        )
+
+    logger.info("Download complete")
+    return "downloaded"
+
+
+def _write_spec(yaml_data, path):
+    # makes the YAML file
+    with open(os.path.join(path, "wings-component.yaml"), 'w+') as stream:
+        _yaml.dump(yaml_data, stream)
+    logger.info("Generated YAML")
+
+
+def _extract(archive, comp_id, path):
+    try:
+        extract_source(archive, comp_id, os.path.join(path, "src"))
+    except zipfile.BadZipFile:
+        raise ValueError("Downloaded zip file seems to be corrupt")
 
-        try:
-            component.pop("location")
-            component.pop("id")
-            component.pop("type")
-            component["documentation"] = component["documentation"].strip()
-            component["files"] = ["src\\*"]
-        except KeyError:
-            logger.warning("Component seems to be missing metadata")
-
-        # loops through every input field
-        if len(component["inputs"]) <= 0:
-            logger.warning("Component has no inputs")
-        for i in (component["inputs"]):
-            files = {}
-            i.pop("id")
-            try:
-                if "XMLSchema" not in (i["type"]):
-                    type_name = i["type"].split("#")
-                    type_name = type_name[len(type_name) - 1]
-
-                    i["type"] = "dcdom:" + type_name
-                    files["files"] = []
-                    data_types[type_name] = files
-            except:
-                logger.warning("no type in " + str(i))
-
-        component["data"] = data_types
-
-        if len(component["outputs"]) <= 0:
-            logger.warning("Component has no outputs")
-        for o in (component["outputs"]):
-            files = {}
-            o.pop("id")
-            try:
-                if "XMLSchema" not in o["type"]:
-                    type_name = o["type"].split("#")
-                    type_name = type_name[len(type_name) - 1]
-
-                    o["type"] = "dcdom:" + type_name
-                    files["files"] = []
-                    data_types[type_name] = files
-            except:
-                logger.warning("no type in " + str(o))
-
-        # makes the YAML file
-        stream = open(os.path.join(path, "wings-component.yaml"), 'w+')
-        yaml.dump(yaml_data, stream, sort_keys=False)
-
-        logger.info("Generated YAML")
-
-        # makes the src folder in the directory
-        try:
-            os.mkdir(os.path.join(path, "src"))
-        except FileExistsError:
-            logger.warning("src folder already exists")
 
-        data_path = os.path.join(path, "data")
+def _download_dir(download_path):
+    # sets path, this determines where the component will be downloaded. Default is
+    # the current directory of the program
+    if download_path is None:
+        return os.getcwd()
+    return download_path
 
-        try:
-            os.mkdir(data_path)
-        except FileExistsError:
-            logger.warning("data folder already exists")
 
-        logger.info("Extracting source code")
-        # unzip components
-        comp_os_path = ""
+def download(component_dir, profile=None, download_path=None, overwrite=False):
+    with _session.client(profile=profile) as wings_instance:
         try:
-            comp_os_path = os.path.join(path, "components")
-            zip_path = os.path.join(comp_os_path, comp_id + ".zip")
-            with zipfile.ZipFile(zip_path, "r") as zip_ref:
-                zip_ref.extractall(comp_os_path)
-        except zipfile.BadZipFile:
-            logger.error("Downloaded zip file seems to be corrupt")
+            status = _engine.run(
+                lambda engine: _download(
+                    engine,
+                    wings_instance,
+                    component_dir,
+                    _download_dir(download_path),
+                    overwrite,
+                )
+            )
+        except ValueError as err:
+            logger.error(err)
             exit(1)
 
-        # copy files into src folder
-        comp_files = os.listdir(os.path.join(comp_os_path, comp_id))
-        for files in comp_files:
-            full_file_name = os.path.join(os.path.join(comp_os_path, comp_id), files)
-            if os.path.isfile(full_file_name):
-                shutil.copy(full_file_name, os.path.join(path, "src"))
+        if status == "skipped":
+            logger.info("Aborting Download")
+            exit(0)
 
-        # remove component folder
-        shutil.rmtree(comp_os_path)
 
-        logger.info("Download complete")
+def find_component_ids(wings_instance, pattern=None, regex=False):
+    """Return the ids of the components in the library matching a glob or a regex."""
+    with _timing.span("get_all_items"):
+        tree = wings_instance.component.get_all_items()
+    ids = [comp_id for _, comp_id in _list.iter_components(tree)]
+    if pattern is None:
+        return ids
+    if regex:
+        match = re.compile(pattern).search
+    else:
+        match = re.compile(fnmatch.translate(pattern)).match
+    return [comp_id for comp_id in ids if match(comp_id)]
+
+
+def download_components(
+    comp_ids=(),
+    profile=None,
+    download_path=None,
+    overwrite=False,
+    all_components=False,
+    pattern=None,
+    regex=False,
+    jobs=4,
+):
+    """Download many components concurrently over one authenticated session.
+
+    With ``all_components``, or when only a ``pattern`` is given, the ids are
+    enumerated from the component library.
+
+    :return: A :class:`DownloadResult` per component
+    :rtype: list
+    """
+    path = _download_dir(download_path)
+
+    async def download_one(engine, comp_id, wings_instance):
+        try:
+            return DownloadResult(
+                comp_id,
+                await _download(engine, wings_instance, comp_id, path, overwrite),
+                None,
+            )
+        except Exception as err:
+            logger.error(f"{comp_id}: {err}")
+            return DownloadResult(comp_id, "failed", err)
+
+    async def download_all(engine):
+        limit = asyncio.Semaphore(jobs)
+        return await asyncio.gather(
+            *(
+                _engine.limited(limit, download_one(engine, c, wings_instance))
+                for c in comp_ids
+            )
+        )
+
+    with _session.client(
+        profile=profile, pool_size=_engine.SERVER_CONCURRENCY
+    ) as wings_instance:
+        if all_components or not comp_ids:
+            comp_ids = find_component_ids(wings_instance, pattern, regex)
+        elif pattern is not None:
+            matching = set(find_component_ids(wings_instance, pattern, regex))
+            comp_ids = [c for c in comp_ids if c in matching]
+        logger.info(f"Downloading {len(comp_ids)} components")
+
+        return list(_engine.run(download_all))
 
 
 def _main():
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Asyncio engine behind publish and download.
+
+Publish and download are coroutines that await their steps and use
+``asyncio.gather`` to overlap the steps that do not depend on each other, such
+as building the code archive while the remote description is fetched. The
+``wings`` client blocks, so every server call runs on a worker thread through
+:meth:`Engine.call`. Each WINGS server has its own pool of ``SERVER_CONCURRENCY``
+threads, which bounds the requests in flight to that server however many
+components are processed at once. Local work, hashing, archiving and
+extracting, runs on a separate pool through :meth:`Engine.work`.
+
+Work that many components share, such as creating a data type they all use, is
+started once through :meth:`Engine.once` and awaited by the others.
+
+:func:`run` is the synchronous entry point of the commands. Called from a
+running event loop, as in Jupyter, it runs on a private loop in a worker thread.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from wcm import _session
+
+# Requests in flight per WINGS server.
+SERVER_CONCURRENCY = int(os.environ.get("WCM_SERVER_CONCURRENCY", 8))
+
+
+class Engine:
+    """Worker threads for the server calls and local work of one event loop."""
+
+    def __init__(self, concurrency=None):
+        self.concurrency = SERVER_CONCURRENCY if concurrency is None else concurrency
+        self._servers = {}
+        self._once = {}
+        self._claimed = set()
+        self._local = ThreadPoolExecutor(
+            max_workers=os.cpu_count() or 1, thread_name_prefix="wcm-local"
+        )
+
+    def _server(self, cli):
+        target = _session.target(cli)
+        if target not in self._servers:
+            self._servers[target] = ThreadPoolExecutor(
+                max_workers=self.concurrency,
+                thread_name_prefix=f"wcm-{len(self._servers)}",
+            )
+        return self._servers[target]
+
+    async def call(self, cli, fn, *args, **kwargs):
+        """Run the blocking server call ``fn`` on a thread of ``cli``'s server."""
+        return await asyncio.get_event_loop().run_in_executor(
+            self._server(cli), functools.partial(fn, *args, **kwargs)
+        )
+
+    async def work(self, fn, *args, **kwargs):
+        """Run the blocking local work ``fn`` on a worker thread."""
+        return await asyncio.get_event_loop().run_in_executor(
+            self._local, functools.partial(fn, *args, **kwargs)
+        )
+
+    def once(self, key, start):
+        """Return the task of ``start()``, started by the first caller with ``key``."""
+        if key not in self._once:
+            self._once[key] = asyncio.ensure_future(start())
+        return self._once[key]
+
+    def claim(self, key):
+        """Tell whether no earlier caller claimed ``key``."""
+        first = key not in self._claimed
+        self._claimed.add(key)
+        return first
+
+    def close(self):
+        for pool in self._servers.values():
+            pool.shutdown()
+        self._local.shutdown()
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def run(main, concurrency=None):
+    """Run the coroutine ``main(engine)`` on a new event loop and return its result."""
+    engine = Engine(concurrency)
+    try:
+        if _running_loop() is None:
+            return asyncio.run(main(engine))
+        # asyncio.run() refuses to nest in a running loop, and the caller expects
+        # to block anyway.
+        with ThreadPoolExecutor(1, thread_name_prefix="wcm-loop") as pool:
+            return pool.submit(asyncio.run, main(engine)).result()
+    finally:
+        engine.close()
+
+
+async def limited(limit, coro):
+    """Await ``coro`` once the semaphore ``limit`` allows it."""
+    async with limit:
+        return await coro
@@ -1,59 +1,192 @@
 import logging
 import json
-import wings
 import os
+import time
+import fnmatch
 import click
-from wcm import _schema, _utils
-from contextlib import contextmanager
+from wcm import _schema, _session, _timing, _utils
 
 logger = logging.getLogger()
 
+# Seconds a cached listing of the component library stays valid.
+LIST_CACHE_TTL = 60
 
-@contextmanager
-def _cli(**kw):
-    i = None
+# ``cls.component.type`` of a component that can run, the others are component types.
+CONCRETE = 2
+
+
+def _name(node):
+    return node["cls"]["component"]["id"].split("#")[-1]
+
+
+def compact(tree):
+    """Return the children of a ``get_all_items()`` node as nested lists.
+
+    Each node is ``[name, children, concrete]``, ``concrete`` telling a
+    component from a component type. A corrupted node is reported and skipped
+    without hiding its siblings.
+    """
+    nodes = []
+    for child in tree.get("children") or ():
+        try:
+            concrete = child["cls"]["component"].get("type") == CONCRETE
+            nodes.append([_name(child), compact(child), concrete])
+        except (KeyError, TypeError, AttributeError):
+            logger.error("Wings error: Maybe, the component is corrupted.")
+    return nodes
+
+
+def _components(nodes):
+    """Yield the names of the concrete components, at any depth, of ``nodes``."""
+    for name, children, concrete in nodes:
+        if concrete:
+            yield name
+        yield from _components(children)
+
+
+def iter_components(tree):
+    """Yield ``(component class, component id)`` pairs of a ``get_all_items()`` tree."""
+    for comp_class, children, _ in compact(tree):
+        for comp_id in _components(children):
+            yield comp_class, comp_id
+
+
+def _cache_file(profile):
+    return _utils.get_cache_dir("list") / f"{profile}.json"
+
+
+def invalidate_cache(profile="default"):
     try:
-        logger.debug("Initializing WINGS API Client")
-        i = wings.init(**kw)
-        yield i
-    finally:
-        if i:
-            i.close()
-
-
-def list_components(profile="default"):
-    outp = ""
-    with _cli(profile=profile) as wings_instance:
-        component = wings_instance.component.get_all_items()
-        component = component["children"]
-        for i in component:
-            try:
-                comp_class = ((i["cls"])["component"])["id"]
-                comp_class = comp_class.split('#')
-
-                outp += "[" + comp_class[-1] + "]\n"
-
-                length = len(i["children"])
-                count = 1
-
-                if length > 0:
-                    outp += "  └─┐\n"
-
-                for j in i["children"]:
-                    comp_id = ((j["cls"])["component"])["id"]
-                    comp_id = comp_id.split('#')
-
-                    if length == 1 or count == length:
-                        outp += "    └─ " + comp_id[-1] + "\n"
-                    else:
-                        outp += "    ├─ " + comp_id[-1] + "\n"
-                    count += 1
-
-                outp += "\n"
-            except:
-                logger.error("Wings error: Maybe, the component is corrupted.")
-
-        click.echo(outp)
+        _cache_file(profile).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def fetch_classes(profile="default", ttl=None, refresh=False):
+    """Return the component classes of the library as :func:`compact` nodes.
+
+    The listing is cached per profile for ``ttl`` seconds, ``refresh`` bypasses the
+    cache.
+    """
+    ttl = LIST_CACHE_TTL if ttl is None else ttl
+    cache_file = _cache_file(profile)
+    if not refresh:
+        try:
+            with _timing.span("read_cache"), cache_file.open() as fh:
+                cached = json.load(fh)
+            if time.time() - cached["fetched"] <= ttl:
+                logger.debug("Using cached component listing")
+                return cached["nodes"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    with _session.client(profile=profile) as wings_instance:
+        with _timing.span("get_all_items"):
+            tree = wings_instance.component.get_all_items()
+        nodes = compact(tree)
+
+    tmp_file = cache_file.with_suffix(".tmp")
+    with tmp_file.open("w") as fh:
+        json.dump({"fetched": time.time(), "nodes": nodes}, fh)
+    os.replace(str(tmp_file), str(cache_file))
+    return nodes
+
+
+def _prune(nodes, name_pattern):
+    """Keep the nodes matching ``name_pattern`` and the ancestors of matching nodes."""
+    pruned = []
+    for name, children, concrete in nodes:
+        if fnmatch.fnmatchcase(name, name_pattern):
+            pruned.append([name, children, concrete])
+        else:
+            children = _prune(children, name_pattern)
+            if children:
+                pruned.append([name, children, concrete])
+    return pruned
+
+
+def filter_classes(classes, type_pattern=None, name_pattern=None):
+    """Keep the classes matching ``type_pattern`` and the components matching
+    ``name_pattern``, both globs.
+    """
+    for comp_class, children, _ in classes:
+        if type_pattern and not fnmatch.fnmatchcase(comp_class, type_pattern):
+            continue
+        if name_pattern:
+            children = _prune(children, name_pattern)
+            if not children:
+                continue
+        yield comp_class, children
+
+
+def _render_children(children, prefix, depth, limit):
+    shown = children[:limit] if limit else children
+    hidden = len(children) - len(shown)
+    for n, (name, grandchildren, _) in enumerate(shown, 1):
+        last = n == len(shown) and not hidden
+        yield prefix + ("└─ " if last else "├─ ") + name
+        if grandchildren and depth > 1:
+            yield from _render_children(
+                grandchildren, prefix + ("   " if last else "│  "), depth - 1, limit
+            )
+    if hidden:
+        yield prefix + f"└─ ... {hidden} more"
+
+
+def render_tree(comp_class, children, depth=None, limit=None):
+    """Yield the lines of a component class, ``depth`` levels deep, ``limit`` wide."""
+    depth = float("inf") if depth is None else depth
+    yield "[" + comp_class + "]"
+    if children and depth > 1:
+        yield "  └─┐"
+        yield from _render_children(children, "    ", depth - 1, limit)
+    yield ""
+
+
+def list_components(
+    profile="default",
+    fmt="tree",
+    type_pattern=None,
+    name_pattern=None,
+    refresh=False,
+    ttl=None,
+    depth=None,
+    limit=None,
+):
+    """Write the component library one class at a time.
+
+    :param fmt: ``tree``, ``json`` (an array of classes), ``jsonl`` (one object per
+        component) or ``count`` (the number of components per class)
+    """
+    classes = fetch_classes(profile, ttl=ttl, refresh=refresh)
+    classes = filter_classes(classes, type_pattern, name_pattern)
+
+    with _timing.span("render", format=fmt):
+        _write_classes(classes, fmt, depth, limit)
+
+
+def _write_classes(classes, fmt, depth, limit):
+    total = 0
+    if fmt == "json":
+        click.echo("[", nl=False)
+    for n, (comp_class, children) in enumerate(classes):
+        if fmt == "json":
+            entry = {"type": comp_class, "components": list(_components(children))}
+            click.echo(("," if n else "") + json.dumps(entry), nl=False)
+        elif fmt == "jsonl":
+            for comp_id in _components(children):
+                click.echo(json.dumps({"type": comp_class, "id": comp_id}))
+        elif fmt == "count":
+            count = sum(1 for _ in _components(children))
+            total += count
+            click.echo(f"[{comp_class}] {count}")
+        else:
+            for line in render_tree(comp_class, children, depth, limit):
+                click.echo(line)
+    if fmt == "json":
+        click.echo("]")
+    elif fmt == "count":
+        click.echo(f"{total} components")
 
 
 def _main():
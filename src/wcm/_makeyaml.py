@@ -1,18 +1,59 @@
 import logging
-import json
-import wings
+import copy
 import os
 import click
-import yaml
-from wcm import _schema, _utils
-from contextlib import contextmanager
+from functools import lru_cache
+from wcm import _schema, _utils, _yaml
 
 logger = logging.getLogger()
-schemaDefinitions = _schema.get_schema()["definitions"]
-error_log = ""
 
 
-def make_yaml(download_path=None):
+def _resolve(ref):
+    """Return the node a local ``$ref`` such as ``#/definitions/ioData`` points to."""
+    node = _schema.get_schema()
+    for part in ref.lstrip("#/").split("/"):
+        if part:
+            node = node[part]
+    return node
+
+
+def _sub_schema(sub_path):
+    """Return the node of a ``$ref`` or a dotted path such as ``wings.requirement``."""
+    if not sub_path:
+        return _schema.get_schema()
+    if sub_path.startswith("#"):
+        return _resolve(sub_path)
+
+    node = _schema.get_schema()
+    for part in sub_path.split("."):
+        node = node.get("properties", {})[part]
+        if "$ref" in node:
+            node = _resolve(node["$ref"])
+    return node
+
+
+@lru_cache(maxsize=None)
+def _outline(schema_version, sub_path):
+    node = _sub_schema(sub_path)
+    if "$ref" in node:
+        node = _resolve(node["$ref"])
+    if "properties" in node:
+        return write_properties(node["properties"])
+    return write_properties({"_": node}).get("_")
+
+
+def outline(sub_path=None):
+    """Return a blank outline of the schema, or of a part of it.
+
+    :param sub_path: A dotted property path (``wings``, ``wings.requirement``) or a
+        ``$ref`` pointer (``#/definitions/ioData``); the whole schema when None
+    """
+    return copy.deepcopy(_outline(_schema.get_schema_version(), sub_path or ""))
+
+
+def make_yaml(download_path=None, sub_path=None):
+    # Resolved first so an unknown sub_path fails before anything is written
+    yaml_outline = outline(sub_path)
 
     # sets path, this determines where the yaml will be made. Default is the current directory
     if download_path is None:
@@ -40,9 +81,8 @@ def make_yaml(download_path=None):
         else:
             exit(0)
 
-    yaml_outline = write_properties(_schema.get_schema()["properties"])
-
-    yaml.dump(yaml_outline, stream, sort_keys=False)
+    with stream:
+        _yaml.dump(yaml_outline, stream)
 
 
 def write_properties(prop):
@@ -63,10 +103,7 @@ def write_properties(prop):
                 elif curr["type"] == "array":
                     ci = curr["items"]
                     if "$ref" in list(ci.keys()):
-                        ref = ci["$ref"]
-                        ref = ref.split('/')
-                        ref = ref[-1]
-                        dict[i] = [write_properties((schemaDefinitions[ref])["properties"])]
+                        dict[i] = [outline(ci["$ref"])]
                     elif "type" in list(ci.keys()):
                         dict[i] = []
                     else:
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Content hashes of what was last published to each WINGS server.
+
+The manifest lives next to the component in ``.wcm-manifest.json`` and holds,
+per publish target, hashes of the component spec, the data type declarations,
+the ``src`` tree and every data file. Comparing them with the current content
+tells a publish which parts can be left untouched.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MANIFEST_FILE = ".wcm-manifest.json"
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(str(path), "rb") as fh:
+        for chunk in iter(lambda: fh.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_tree(root):
+    """Hash the relative paths and contents of every file under ``root``."""
+    root = Path(root)
+    digest = hashlib.sha256()
+    for path in sorted(p for p in root.rglob("*") if p.is_file()):
+        digest.update(path.relative_to(root).as_posix().encode())
+        digest.update(b"\0")
+        digest.update(hash_file(path).encode())
+    return digest.hexdigest()
+
+
+def hash_object(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True).encode()).hexdigest()
+
+
+def compute_state(component_dir, spec, files=True):
+    """Return the hashes of everything a publish of ``spec`` sends to the server.
+
+    Without ``files`` the data files are not read, they may not even exist.
+    """
+    component_dir = Path(component_dir)
+    wings_component = dict(spec["wings"])
+    data = wings_component.pop("data", None) or {}
+
+    hashes = {}
+    for _file in data.values() if files else ():
+        for f in (_file or {}).get("files", ()):
+            hashes[f] = hash_file(component_dir / f)
+
+    return {
+        "componentType": wings_component.get("componentType"),
+        "spec": hash_object(dict(spec, wings=wings_component)),
+        "dataTypes": hash_object(data),
+        "src": hash_tree(component_dir / "src"),
+        "files": hashes,
+    }
+
+
+def changed(previous, current):
+    """Return the parts of ``current`` that differ from ``previous``.
+
+    :return: A dict with boolean ``spec``, ``dataTypes`` and ``src`` entries and
+        the set of changed data ``files``
+    :rtype: dict
+    """
+    previous = previous or {}
+    prev_files = previous.get("files", {})
+    return {
+        "spec": previous.get("spec") != current["spec"],
+        "dataTypes": previous.get("dataTypes") != current["dataTypes"],
+        "src": previous.get("src") != current["src"],
+        "files": {f for f, h in current["files"].items() if prev_files.get(f) != h},
+    }
+
+
+class Manifest:
+    def __init__(self, component_dir):
+        self.path = Path(component_dir) / MANIFEST_FILE
+        try:
+            with self.path.open() as fh:
+                self.targets = json.load(fh)
+        except (OSError, ValueError):
+            self.targets = {}
+
+    def get(self, target):
+        return self.targets.get(target)
+
+    def update(self, target, state):
+        self.targets[target] = state
+        tmp_path = self.path.with_suffix(".tmp")
+        with tmp_path.open("w") as fh:
+            json.dump(self.targets, fh, indent=2, sort_keys=True)
+        os.replace(str(tmp_path), str(self.path))
@@ -1,12 +1,19 @@
 # -*- coding: utf-8 -*-
 
+import hashlib
+import json
 import logging
+import os
+from functools import lru_cache
 
 from jsonschema import Draft7Validator
 
 
 schemaVersion = "0.0.1"
 
+# Names of the specification file of a component directory, in order of preference.
+SPEC_FILES = ("wings-component.yml", "wings-component.yaml")
+
 schema = {
     "type": "object",
     "required": ["name", "version"],
@@ -137,12 +144,66 @@ def _msg(e):
     return e.message
 
 
+def _json_path(path):
+    return "$" + "".join(f"[{p}]" if isinstance(p, int) else f".{p}" for p in path)
+
+
+@lru_cache(maxsize=None)
+def compiled_validator():
+    """Return a code generated validator for the schema, None without fastjsonschema.
+
+    The generated code is cached under ``~/.wcm/cache/validators``, keyed by the
+    schema version and a hash of the schema, so it is only generated once. The
+    validator is loaded once per process.
+    """
+    try:
+        import fastjsonschema
+    except ImportError:
+        return None
+
+    digest = hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+    key = f"{schemaVersion}-{digest[:16]}"
+
+    from wcm import _utils
+
+    cache_file = (
+        _utils.get_cache_dir("validators") / f"{key}-{fastjsonschema.VERSION}.py"
+    )
+    try:
+        code = cache_file.read_text()
+    except OSError:
+        code = fastjsonschema.compile_to_code(schema)
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp_file.write_text(code)
+        os.replace(str(tmp_file), str(cache_file))
+
+    namespace = {}
+    exec(compile(code, str(cache_file), "exec"), namespace)
+    return namespace["validate"]
+
+
+def iter_errors(spec):
+    """Yield ``{"path": <JSON path>, "message": <message>}`` per error in ``spec``."""
+    fast = compiled_validator()
+    if fast is not None:
+        try:
+            fast(spec)
+            return
+        except Exception:
+            # The generated validator stops at the first error (and also checks
+            # formats), let the reference validator report every error.
+            pass
+
+    for e in sorted(v.iter_errors(spec), key=lambda e: list(map(str, e.absolute_path))):
+        yield {"path": _json_path(e.absolute_path), "message": _msg(e)}
+
+
 def check_package_spec(spec):
     """Check package specification."""
     err = []
-    for e in v.iter_errors(spec):
-        err.append(_msg(e))
-        logging.error(_msg(e))
+    for e in iter_errors(spec):
+        err.append(e["message"])
+        logging.error(f"{e['path']}: {e['message']}")
 
     if err:
         raise ValueError("Invalid component specification.")
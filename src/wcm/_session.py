@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+"""Authenticated WINGS sessions shared by publish, download and list.
+
+A successful login is persisted per profile under ``~/.wcm/sessions`` so that
+consecutive ``wcm`` invocations reuse the server session instead of logging in
+again. A persisted session is dropped once it has been idle for longer than the
+server's session timeout, and a request rejected by the server for lack of
+authentication transparently logs in again and is replayed.
+"""
+
+import configparser
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from wcm import _timing, _transport, _utils
+
+__DEFAULT_WCM_CREDENTIALS_FILE__ = "~/.wcm/credentials"
+
+# Tomcat's default idle timeout for a WINGS session, in seconds.
+SESSION_TTL = 30 * 60
+
+log = logging.getLogger()
+
+
+def load_credentials(profile=None, credentials_file=None, **overrides):
+    """Resolve WINGS credentials.
+
+    Overrides win over environment variables, which win over the credentials file.
+    """
+    profile = profile or os.getenv("WCM_PROFILE", "default")
+    credentials_file, config = _read_credentials_file(credentials_file)
+    section = config[profile] if config.has_section(profile) else {}
+
+    keys = {
+        "server": ("WCM_WINGS_SERVER", "serverWings"),
+        "export_url": ("WCM_WINGS_EXPORT_URL", "exportWingsURL"),
+        "username": ("WCM_USER", "userWings"),
+        "password": ("WCM_PASSWORD", "passwordWings"),
+        "domain": ("WCM_DOMAIN", "domainWings"),
+    }
+    creds = {}
+    for key, (env, attr) in keys.items():
+        value = overrides.get(key) or os.getenv(env) or section.get(attr)
+        if value is None:
+            raise ValueError(
+                f"Unable to find credential attribute <{attr}> for profile <{profile}> "
+                f"in CLI overrides, environment variables or <{credentials_file}>"
+            )
+        creds[key] = value
+    creds["server"] = creds["server"].strip("/")
+    return creds
+
+
+def _read_credentials_file(credentials_file=None):
+    credentials_file = Path(
+        credentials_file
+        or os.getenv("WCM_CREDENTIALS_FILE", __DEFAULT_WCM_CREDENTIALS_FILE__)
+    ).expanduser()
+    config = configparser.ConfigParser()
+    config.optionxform = str
+    if credentials_file.exists():
+        config.read(credentials_file)
+    return credentials_file, config
+
+
+def expand_profiles(profiles, credentials_file=None):
+    """Replace the profile groups in ``profiles`` by the profiles they list.
+
+    A group is a section of the credentials file with a ``profiles`` entry,
+    e.g. ``profiles = dev staging prod``, whose members may be groups too.
+    """
+    _, config = _read_credentials_file(credentials_file)
+    expanded = []
+
+    def add(profile, seen):
+        if profile in seen:
+            raise ValueError(f"Profile group <{profile}> includes itself")
+        if config.has_option(profile, "profiles"):
+            for member in config.get(profile, "profiles").replace(",", " ").split():
+                add(member, seen | {profile})
+        elif profile not in expanded:
+            expanded.append(profile)
+
+    for profile in profiles:
+        add(profile, set())
+    return expanded
+
+
+class SessionStore:
+    """On-disk cache of the cookies of an authenticated WINGS session."""
+
+    def __init__(self, profile, server, username, ttl=None):
+        self.path = _utils.get_wcm_home() / "sessions" / f"{profile}.json"
+        self.server = server
+        self.username = username
+        self.ttl = SESSION_TTL if ttl is None else ttl
+
+    def load(self):
+        """Return the cookies persisted for this account, None if missing or stale."""
+        try:
+            with self.path.open() as fh:
+                saved = json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+        if (saved.get("server"), saved.get("username")) != (self.server, self.username):
+            return None
+        if time.time() - saved.get("lastUsed", 0) > self.ttl:
+            log.debug("Persisted WINGS session expired")
+            return None
+        return saved.get("cookies")
+
+    def save(self, cookies):
+        os.makedirs(str(self.path.parent), exist_ok=True)
+        self.path.parent.chmod(0o700)
+        tmp_path = self.path.with_suffix(".tmp")
+        fd = os.open(str(tmp_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as fh:
+            json.dump(
+                {
+                    "server": self.server,
+                    "username": self.username,
+                    "lastUsed": time.time(),
+                    "cookies": cookies,
+                },
+                fh,
+            )
+        os.replace(str(tmp_path), str(self.path))
+
+    def clear(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def target(cli):
+    """Identify the WINGS server, user and domain an API client talks to."""
+    return f"{cli.kwargs['username']}@{cli.kwargs['server']}/{cli.kwargs['domain']}"
+
+
+def _is_auth_failure(resp):
+    if resp.status_code == 401:
+        return True
+    # WINGS uses form based authentication, so an unauthenticated request is
+    # answered with the login form instead of the requested resource.
+    return "text/html" in resp.headers.get(
+        "Content-Type", ""
+    ) and b"j_security_check" in resp.content
+
+
+def _client_class():
+    import wings
+    from requests.cookies import get_cookie_header
+
+    class CachedSessionClient(wings.ApiClient):
+        """WINGS API client that restores and persists its login cookies."""
+
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            # Some releases of ``wings`` log in on construction, others leave it to
+            # the caller.
+            if (
+                self._relogin_on_auth_failure not in self.session.hooks["response"]
+                and not self.login()
+            ):
+                raise ValueError("Login failed")
+
+        def login(self, *args, **kwargs):
+            cookies = self.kwargs["store"].load()
+            if cookies:
+                log.debug("Reusing persisted WINGS session")
+                self.session.cookies.update(cookies)
+            elif not self._login(*args, **kwargs):
+                return False
+
+            if self._relogin_on_auth_failure not in self.session.hooks["response"]:
+                self.session.hooks["response"].append(self._relogin_on_auth_failure)
+            return True
+
+        def _login(self, *args, **kwargs):
+            log.debug("Logging in to WINGS")
+            hooks = self.session.hooks["response"]
+            self.session.hooks["response"] = []
+            if (
+                not (args or kwargs)
+                and "password" in inspect.signature(super().login).parameters
+            ):
+                args = (self.kwargs["password"],)
+            try:
+                self.session.cookies.clear()
+                if super().login(*args, **kwargs) is False:
+                    return False
+            finally:
+                self.session.hooks["response"] = hooks
+            self.kwargs["store"].save(self.session.cookies.get_dict())
+            return True
+
+        def _relogin_on_auth_failure(self, resp, **kwargs):
+            retried = getattr(resp.request, "wcm_retried", False)
+            if retried or not _is_auth_failure(resp):
+                return resp
+
+            with self.kwargs["lock"]:
+                # Concurrent requests may all fail on the same expired session,
+                # only the first one needs to log in again.
+                request = resp.request.copy()
+                sent = request.headers.pop("Cookie", None)
+                if sent == get_cookie_header(self.session.cookies, request):
+                    log.info("WINGS session expired, logging in again")
+                    self.kwargs["store"].clear()
+                    if not self._login():
+                        raise ValueError("Login failed")
+
+            request.wcm_retried = True
+            request.prepare_cookies(self.session.cookies)
+            return self.session.send(request, **kwargs)
+
+        def logout(self):
+            # Keep the server side session alive for the next invocation.
+            self.session.close()
+
+        def close(self):
+            self.kwargs["store"].save(self.session.cookies.get_dict())
+            self.logout()
+
+    return CachedSessionClient
+
+
+@contextmanager
+def client(profile=None, pool_size=None, **creds):
+    """Yield an authenticated WINGS API client for ``profile``.
+
+    Clients share one pool of keep-alive connections (see :mod:`wcm._transport`).
+    A client may be shared between threads, ``pool_size`` should then be at
+    least the number of threads using it.
+    """
+    profile = profile or os.getenv("WCM_PROFILE", "default")
+    creds = load_credentials(profile, **creds)
+    store = SessionStore(profile, creds["server"], creds["username"])
+
+    i = None
+    try:
+        log.debug("Initializing WINGS API Client")
+        with _timing.span("login", profile=profile):
+            i = _client_class()(store=store, lock=threading.RLock(), **creds)
+            _transport.mount(i.session, pool_size)
+        yield i
+    finally:
+        if i:
+            i.close()
+        for host, counts in _transport.stats().items():
+            log.debug(
+                f"HTTP connections to {host}: {counts['opened']} opened, "
+                f"{counts['reused']} reused, {counts['resumed']} TLS sessions resumed"
+            )
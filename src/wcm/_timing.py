@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""Timing of the phases of publish, download and list.
+
+Phases are wrapped in :func:`span`. Spans are only recorded once :func:`enable`
+has been called, by ``wcm --timings`` and friends, until then a span costs a
+single flag check. Spans opened by a coroutine are attributed to its asyncio
+task rather than to the event loop's thread, so concurrent pipelines appear as
+separate timelines. Recorded spans can be summarised per phase, written as JSON
+or written in the Chrome trace event format, which chrome://tracing and
+https://ui.perfetto.dev display as a timeline per thread.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
+# ``start`` is in seconds since the module was loaded.
+Span = namedtuple("Span", ["name", "start", "duration", "thread", "args"])
+
+_enabled = False
+_lock = threading.Lock()
+_spans = []
+_origin = time.perf_counter()
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+
+
+def spans():
+    with _lock:
+        return list(_spans)
+
+
+def _ident():
+    # asyncio is only imported here once some command uses it.
+    asyncio = sys.modules.get("asyncio")
+    if asyncio is not None:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is not None:
+            return id(task)
+    return threading.get_ident()
+
+
+@contextmanager
+def span(name, **args):
+    """Time the enclosed block as phase ``name``, ``args`` tell what it worked on."""
+    if not _enabled:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = Span(
+            name, start - _origin, time.perf_counter() - start, _ident(), args
+        )
+        with _lock:
+            _spans.append(record)
+
+
+def timed(name, fn, **args):
+    """Wrap ``fn`` so each call is timed as phase ``name``, on the thread running it."""
+    def wrapper(*a, **kw):
+        with span(name, **args):
+            return fn(*a, **kw)
+    return wrapper
+
+
+def summary(records=None):
+    """Return the count, total, mean and max duration per phase, in order of use."""
+    phases = OrderedDict()
+    for s in spans() if records is None else records:
+        phases.setdefault(s.name, []).append(s.duration)
+    return [
+        {
+            "name": name,
+            "count": len(d),
+            "total": sum(d),
+            "mean": sum(d) / len(d),
+            "max": max(d),
+        }
+        for name, d in phases.items()
+    ]
+
+
+def format_table(records=None):
+    """Return the phase summary as lines of a plain text table."""
+    lines = [f"{'phase':<24}{'count':>7}{'total':>11}{'mean':>11}{'max':>11}"]
+    for row in summary(records):
+        lines.append(
+            f"{row['name']:<24}{row['count']:>7}"
+            f"{row['total']:>10.3f}s{row['mean']:>10.3f}s{row['max']:>10.3f}s"
+        )
+    return lines
+
+
+def write_json(path, records=None, **extra):
+    """Write every span and the phase summary, plus any ``extra`` entries, as JSON."""
+    records = spans() if records is None else records
+    report = {"spans": [s._asdict() for s in records], "summary": summary(records)}
+    report.update(extra)
+    with open(str(path), "w") as fh:
+        json.dump(report, fh, indent=2, default=str)
+
+
+def write_trace(path, records=None):
+    """Write the spans as Chrome trace "complete" events."""
+    pid = os.getpid()
+    events = [
+        {
+            "name": s.name,
+            "ph": "X",
+            "ts": round(s.start * 1e6),
+            "dur": round(s.duration * 1e6),
+            "pid": pid,
+            "tid": s.thread,
+            "args": s.args,
+        }
+        for s in (spans() if records is None else records)
+    ]
+    with open(str(path), "w") as fh:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fh, default=str)
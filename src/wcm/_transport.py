@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""Pooled keep-alive HTTP transport shared by every WINGS API client.
+
+Each ``wings`` client comes with a fresh ``requests`` session, which would open
+new TCP connections, and redo the TLS handshake, for every component. Instead
+every session of the process mounts the same adapter, so connections to a WINGS
+server stay open across components and commands. TCP keep-alive probes keep
+idle connections from being dropped by NAT gateways on long WAN links, the CA
+bundle is loaded into a single TLS context, and new TLS connections resume the
+last session negotiated with the host.
+
+Per host counters of the connections opened, the requests sent over an already
+open connection and the resumed TLS sessions show how well this works.
+"""
+
+import logging
+import os
+import socket
+import ssl
+import threading
+from collections import Counter, defaultdict
+
+log = logging.getLogger()
+
+# Connections kept open per host, raised when a caller needs more.
+POOL_SIZE = 10
+
+# Idle seconds before the first TCP keep-alive probe, 0 disables connection reuse.
+KEEP_ALIVE = 60
+
+_lock = threading.Lock()
+_stats = defaultdict(Counter)
+_adapter = None
+_contexts = {}
+
+
+def pool_size():
+    return int(os.getenv("WCM_POOL_SIZE", POOL_SIZE))
+
+
+def keep_alive():
+    return int(os.getenv("WCM_KEEP_ALIVE", KEEP_ALIVE))
+
+
+def _count(host, key):
+    with _lock:
+        _stats[host][key] += 1
+
+
+def stats():
+    """Return ``{host: {"opened": n, "reused": n, "resumed": n}}`` for this process."""
+    with _lock:
+        return {
+            host: {key: counts[key] for key in ("opened", "reused", "resumed")}
+            for host, counts in _stats.items()
+        }
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+
+
+def _socket_options(idle):
+    from urllib3.connection import HTTPConnection
+
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle))
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(1, idle // 4)))
+    return options
+
+
+class _ResumingContext(ssl.SSLContext):
+    """TLS context offering each host the session last negotiated with it."""
+
+    def wrap_socket(self, sock, *args, server_hostname=None, session=None, **kwargs):
+        session = session or self.sessions.get(server_hostname)
+        try:
+            return super().wrap_socket(
+                sock, *args, server_hostname=server_hostname, session=session, **kwargs
+            )
+        except ValueError:
+            # The cached session may no longer be usable, negotiate a new one.
+            self.sessions.pop(server_hostname, None)
+            return super().wrap_socket(
+                sock, *args, server_hostname=server_hostname, **kwargs
+            )
+
+
+def _tls_context(ca_certs):
+    """Return the shared TLS context trusting ``ca_certs``, loading the bundle once."""
+    with _lock:
+        ctx = _contexts.get(ca_certs)
+        if ctx is None:
+            ctx = _ResumingContext(ssl.PROTOCOL_TLS_CLIENT)
+            ctx.minimum_version = ssl.TLSVersion.TLSv1_2
+            ctx.load_verify_locations(ca_certs)
+            ctx.sessions = {}
+            _contexts[ca_certs] = ctx
+        return ctx
+
+
+def _connection_classes():
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+
+    class _Counting:
+        """Count fresh and reused connections per host."""
+
+        _fresh = False
+
+        def connect(self):
+            super().connect()
+            self._fresh = True
+
+        def request(self, *args, **kwargs):
+            try:
+                return super().request(*args, **kwargs)
+            finally:
+                host = f"{self.host}:{self.port}"
+                _count(host, "opened" if self._fresh else "reused")
+                self._fresh = False
+
+    class PooledHTTPConnection(_Counting, HTTPConnection):
+        pass
+
+    class PooledHTTPSConnection(_Counting, HTTPSConnection):
+        def connect(self):
+            # Only share the context for the default verification settings,
+            # anything else keeps urllib3's per connection context.
+            shared = (
+                self.ssl_context is None
+                and self.ca_certs
+                and not (self.ca_cert_dir or self.cert_file or self.assert_fingerprint)
+                and self.cert_reqs in (None, "CERT_REQUIRED", ssl.CERT_REQUIRED)
+            )
+            if shared:
+                self.ssl_context = _tls_context(self.ca_certs)
+                self.ca_certs = None
+            super().connect()
+            if shared and getattr(self.sock, "session_reused", False):
+                _count(f"{self.host}:{self.port}", "resumed")
+
+        def getresponse(self, *args, **kwargs):
+            resp = super().getresponse(*args, **kwargs)
+            # TLS 1.3 servers send session tickets after the handshake.
+            session = getattr(self.sock, "session", None)
+            if isinstance(self.ssl_context, _ResumingContext) and session is not None:
+                self.ssl_context.sessions[self.server_hostname or self.host] = session
+            return resp
+
+    return PooledHTTPConnection, PooledHTTPSConnection
+
+
+def _adapter_class():
+    from requests.adapters import HTTPAdapter
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    http_conn, https_conn = _connection_classes()
+
+    class PooledHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = http_conn
+
+    class PooledHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = https_conn
+
+    class PooledAdapter(HTTPAdapter):
+        """HTTP adapter shared by all sessions, whose pools outlive any one of them."""
+
+        def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+            idle = keep_alive()
+            if idle:
+                pool_kwargs.setdefault("socket_options", _socket_options(idle))
+            super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                "http": PooledHTTPConnectionPool,
+                "https": PooledHTTPSConnectionPool,
+            }
+
+        def grow(self, size):
+            """Keep up to ``size`` connections open per host."""
+            with _lock:
+                if size <= self._pool_maxsize:
+                    return
+                self._pool_maxsize = size
+                self.poolmanager.connection_pool_kw["maxsize"] = size
+                for key in self.poolmanager.pools.keys():
+                    pool = self.poolmanager.pools.get(key)
+                    if pool is not None:
+                        pool.pool.maxsize = size
+
+        def add_headers(self, request, **kwargs):
+            if not keep_alive():
+                request.headers["Connection"] = "close"
+
+        def close(self):
+            # Sessions close their adapters when done, the shared pools stay open.
+            pass
+
+        def shutdown(self):
+            super().close()
+
+    return PooledAdapter
+
+
+def adapter(size=None):
+    """Return the shared adapter, pooling at least ``size`` connections per host."""
+    global _adapter
+    size = max(size or 0, pool_size())
+    with _lock:
+        if _adapter is None:
+            _adapter = _adapter_class()(pool_connections=POOL_SIZE, pool_maxsize=size)
+    _adapter.grow(size)
+    return _adapter
+
+
+def mount(session, size=None):
+    """Replace the default HTTP adapters of a ``requests`` session by the shared one."""
+    from requests.adapters import HTTPAdapter
+
+    shared = adapter(size)
+    for prefix, current in list(session.adapters.items()):
+        if type(current) is HTTPAdapter:
+            session.mount(prefix, shared)
+            current.close()
+
+
+def close():
+    """Close every pooled connection."""
+    global _adapter
+    with _lock:
+        current, _adapter = _adapter, None
+    if current is not None:
+        current.shutdown()
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""Chunked, resumable uploads to the WINGS ``upload`` servlet.
+
+Files are streamed from disk in ``CHUNK_SIZE`` pieces the way plupload sends
+them: each request carries the ``chunk`` index and the number of ``chunks``,
+and the server appends it to the file it is assembling, so memory use is
+bounded by one chunk whatever the size of the file. Files that fit in one
+chunk are sent as a single plain upload.
+
+Each acknowledged chunk is recorded in ``~/.wcm/cache/uploads``, keyed by the
+sha256 of the content, so an upload that is interrupted, in this run or an
+earlier one, resumes at the first chunk the server did not acknowledge. When the
+server rejects a resumed upload, having lost the chunks it had, the upload starts
+over from the first chunk.
+
+The server assembles the chunks of a file by its ``name``, so chunked uploads of
+files with the same name to the same server, e.g. the ``sample.csv`` of several
+components published together, are sent one after the other.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+from wcm import _session, _timing, _utils
+
+log = logging.getLogger()
+
+# Bytes sent per request, files up to this size are sent whole.
+CHUNK_SIZE = int(os.environ.get("WCM_CHUNK_SIZE", 8 * 1024 * 1024))
+# Seconds an interrupted upload can be resumed for.
+RESUME_TTL = 24 * 60 * 60
+# Seconds between progress reports of a chunked upload.
+PROGRESS_INTERVAL = 2.0
+
+# ``resumed`` is the number of chunks acknowledged by an earlier attempt.
+UploadResult = namedtuple(
+    "UploadResult", ["location", "bytes", "seconds", "chunks", "resumed"]
+)
+
+# One lock per file the server is assembling, by target, kind and name.
+_assembling = {}
+_assembling_lock = threading.Lock()
+
+
+def _assembly_lock(target, kind, name):
+    with _assembling_lock:
+        return _assembling.setdefault((target, kind, name), threading.Lock())
+
+
+def _state_file(digest, key):
+    # The same content may be on its way to several servers, or under several names.
+    suffix = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return _utils.get_cache_dir("uploads") / f"{digest}-{suffix}.json"
+
+
+def _load_state(path, key):
+    try:
+        with path.open() as fh:
+            state = json.load(fh)
+        if state["key"] == key and time.time() - state["updated"] <= RESUME_TTL:
+            return state["done"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return 0
+
+
+def _save_state(path, key, done):
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("w") as fh:
+        json.dump({"key": key, "done": done, "updated": time.time()}, fh)
+    os.replace(str(tmp_path), str(path))
+
+
+def _clear_state(path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _size(fh):
+    position = fh.tell()
+    size = fh.seek(0, os.SEEK_END)
+    fh.seek(position)
+    return size
+
+
+def _digest(fh):
+    digest = hashlib.sha256()
+    fh.seek(0)
+    for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+        digest.update(chunk)
+    fh.seek(0)
+    return digest.hexdigest()
+
+
+def chunks(size, chunk_size=None):
+    """Return the number of requests an upload of ``size`` bytes takes."""
+    return max(1, -(-size // (CHUNK_SIZE if chunk_size is None else chunk_size)))
+
+
+def _send(cli, fields, name, data):
+    resp = cli.session.post(
+        cli.get_request_url() + "upload", data=fields, files={"file": (name, data)}
+    )
+    cli.check_request(resp)
+    # Every chunk is acknowledged, only the last one with the location of the
+    # assembled file.
+    details = resp.json()
+    if not details.get("success"):
+        raise ValueError(f"Server rejected the upload of {name}")
+    return details
+
+
+def _report(name, position, size, sent, started):
+    elapsed = max(time.perf_counter() - started, 1e-6)
+    log.info(
+        f"Uploading {name}: {position * 100 // size}% of {size / 2 ** 20:.1f} MiB, "
+        f"{sent / 2 ** 20 / elapsed:.1f} MiB/s"
+    )
+    return time.perf_counter()
+
+
+def upload(cli, fh, name, kind, digest=None, chunk_size=None, **fields):
+    """Upload the content of a seekable binary file object as ``name``.
+
+    :param kind: The upload ``type``, ``data`` or ``component``
+    :param digest: The sha256 of the content, computed when None
+    :param fields: Further form fields, e.g. the ``id`` of a component
+    :return: Where the server stored the file, and how the upload went
+    :rtype: UploadResult
+    """
+    chunk_size = CHUNK_SIZE if chunk_size is None else chunk_size
+    size = _size(fh)
+    n = chunks(size, chunk_size)
+    fields = dict(fields, name=name, type=kind)
+    started = time.perf_counter()
+
+    if n == 1:
+        fh.seek(0)
+        with _timing.span("upload_chunk", file=name, bytes=size):
+            details = _send(cli, fields, name, fh.read())
+        return UploadResult(
+            details["location"], size, time.perf_counter() - started, 1, 0
+        )
+
+    target = _session.target(cli)
+    with _assembly_lock(target, kind, name):
+        return _upload_chunks(
+            cli, fh, fields, name, kind, digest, size, chunk_size, target, started
+        )
+
+
+def _upload_chunks(
+    cli, fh, fields, name, kind, digest, size, chunk_size, target, started
+):
+    """Send a file in chunks, resuming an earlier attempt, while it is assembled."""
+    n = chunks(size, chunk_size)
+    digest = digest or _digest(fh)
+    key = f"{target} {kind} {name} {size} {chunk_size}"
+    state_file = _state_file(digest, key)
+    resumed = _load_state(state_file, key)
+    if resumed:
+        log.info(f"Resuming the upload of {name} at chunk {resumed + 1}/{n}")
+
+    try:
+        details = _send_chunks(
+            cli, fh, fields, name, size, chunk_size, resumed, state_file, key, started
+        )
+    except ValueError:
+        _clear_state(state_file)
+        if not resumed:
+            raise
+        # The server dropped the chunks sent earlier, e.g. it restarted meanwhile.
+        log.warning(f"The server lost the partial upload of {name}, starting it over")
+        resumed = 0
+        details = _send_chunks(
+            cli, fh, fields, name, size, chunk_size, 0, state_file, key, started
+        )
+
+    state_file.unlink()
+    sent = size - resumed * chunk_size
+    return UploadResult(
+        details["location"], sent, time.perf_counter() - started, n, resumed
+    )
+
+
+def _send_chunks(
+    cli, fh, fields, name, size, chunk_size, start, state_file, key, started
+):
+    """Send the chunks from index ``start`` on, recording each acknowledged one."""
+    n = chunks(size, chunk_size)
+    reported = started
+    for index in range(start, n):
+        fh.seek(index * chunk_size)
+        data = fh.read(chunk_size)
+        with _timing.span("upload_chunk", file=name, chunk=index, bytes=len(data)):
+            details = _send(cli, dict(fields, chunk=index, chunks=n), name, data)
+        _save_state(state_file, key, index + 1)
+        if index == n - 1 or time.perf_counter() - reported >= PROGRESS_INTERVAL:
+            position = index * chunk_size + len(data)
+            reported = _report(
+                name, position, size, position - start * chunk_size, started
+            )
+    return details
+
+
+def upload_data(cli, path, dtype, digest=None):
+    """Upload a data file and register it as data of type ``dtype``, as ``wings`` does.
+
+    :return: The data id
+    :rtype: str
+    """
+    with open(str(path), "rb") as fh:
+        result = upload(cli, fh, os.path.basename(str(path)), "data", digest)
+    dataid = re.sub(r"(^\d.+$)", r"_\1", os.path.basename(result.location))
+    cli.data.add_data_for_type(dataid, dtype)
+    cli.data.set_data_location(dataid, result.location)
+    return dataid
@@ -1,8 +1,24 @@
 # -*- coding: utf-8 -*-
 
+import json
 import logging
 import os
-import requests
+import threading
+import time
+from pathlib import Path
+
+__DEFAULT_WCM_HOME__ = "~/.wcm"
+
+# Seconds a cached PyPI version lookup stays valid.
+VERSION_CHECK_TTL = 24 * 60 * 60
+
+# Hard deadline, in seconds, for a background PyPI version lookup.
+VERSION_CHECK_DEADLINE = 1.0
+
+# Seconds before a lookup that failed or did not finish is tried again.
+VERSION_CHECK_BACKOFF = 60 * 60
+
+log = logging.getLogger()
 
 
 def init_logger():
@@ -14,5 +30,130 @@ def init_logger():
     logger.setLevel(logging.DEBUG if os.getenv("WINGS_DEBUG", False) else logging.INFO)
 
 
-def get_latest_version():
-    return requests.get("https://pypi.org/pypi/wcm/json").json()["info"]["version"]
+def is_offline():
+    """Return True if wcm must not contact any server besides WINGS."""
+    return bool(os.getenv("WCM_OFFLINE"))
+
+
+def get_wcm_home():
+    """Return the wcm state directory, creating it with owner only permissions."""
+    home = Path(os.getenv("WCM_HOME", __DEFAULT_WCM_HOME__)).expanduser()
+    if not home.exists():
+        os.makedirs(str(home), exist_ok=True)
+        home.chmod(0o700)
+    return home
+
+
+def get_cache_dir(*parts):
+    """Return a directory under ``<wcm-home>/cache``, creating it if missing."""
+    cache_dir = get_wcm_home().joinpath("cache", *parts)
+    os.makedirs(str(cache_dir), exist_ok=True)
+    return cache_dir
+
+
+def get_latest_version(timeout=None):
+    import requests
+
+    return requests.get("https://pypi.org/pypi/wcm/json", timeout=timeout).json()[
+        "info"
+    ]["version"]
+
+
+def _version_cache_file():
+    return get_cache_dir() / "latest-version.json"
+
+
+def _read_version_cache():
+    try:
+        with _version_cache_file().open() as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def read_cached_version(ttl=VERSION_CHECK_TTL):
+    """Return the cached latest wcm version, or None if missing or expired."""
+    cached = _read_version_cache()
+    if time.time() - cached.get("checked", 0) > ttl:
+        return None
+    return cached.get("version")
+
+
+def write_cached_version(version, attempted=False):
+    """Cache ``version``, or with ``attempted`` only record that a lookup started.
+
+    An attempt keeps the version found last, and holds off further lookups for
+    ``VERSION_CHECK_BACKOFF`` seconds whether it succeeds, fails or is cut short
+    by the process exiting.
+    """
+    now = time.time()
+    if attempted:
+        cached = _read_version_cache()
+        cached = {"version": cached.get("version"), "checked": cached.get("checked", 0)}
+    else:
+        cached = {"version": version, "checked": now}
+    cached["attempted"] = now
+
+    cache_file = _version_cache_file()
+    tmp_file = cache_file.with_suffix(".tmp")
+    with tmp_file.open("w") as fh:
+        json.dump(cached, fh)
+    os.replace(str(tmp_file), str(cache_file))
+
+
+class VersionCheck:
+    """Look up the latest wcm release without blocking the caller.
+
+    A fresh on-disk cache is answered synchronously. Otherwise PyPI is queried
+    from a daemon thread bounded by ``deadline`` seconds, and the result is
+    cached for later invocations. The attempt is recorded before the query, so
+    a slow or unreachable index is only queried again after
+    ``VERSION_CHECK_BACKOFF`` seconds, even when the process exits first.
+    """
+
+    def __init__(self, ttl=VERSION_CHECK_TTL, deadline=VERSION_CHECK_DEADLINE):
+        self.ttl = ttl
+        self.deadline = deadline
+        self.latest = None
+        self._thread = None
+
+    @staticmethod
+    def enabled():
+        return not (is_offline() or os.getenv("WCM_NO_VERSION_CHECK"))
+
+    def start(self):
+        if not self.enabled():
+            return self
+
+        cached = _read_version_cache()
+        now = time.time()
+        self.latest = cached.get("version")
+        if now - cached.get("checked", 0) > self.ttl:
+            if now - cached.get("attempted", 0) <= VERSION_CHECK_BACKOFF:
+                return self
+            # Answer with the stale version until the lookup finishes. The check
+            # is best effort, without a usable cache it is left out.
+            try:
+                write_cached_version(None, attempted=True)
+            except OSError as e:
+                log.debug(f"Unable to cache the latest wcm version: {e}")
+                return self
+            self._thread = threading.Thread(
+                target=self._fetch, name="wcm-version-check", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def _fetch(self):
+        try:
+            version = get_latest_version(timeout=self.deadline)
+            write_cached_version(version)
+            self.latest = version
+        except Exception as e:
+            log.debug(f"Unable to check for the latest wcm version: {e}")
+
+    def result(self, timeout=0.0):
+        """Return the latest version known, waiting at most ``timeout`` seconds."""
+        if self._thread is not None and timeout:
+            self._thread.join(timeout)
+        return self.latest
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Offline validation of many component specifications."""
+
+import logging
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from wcm import _schema
+from wcm._schema import SPEC_FILES
+
+log = logging.getLogger()
+
+# Below this many specs, validating in-process beats starting worker processes.
+PARALLEL_THRESHOLD = 64
+
+ValidationResult = namedtuple("ValidationResult", ["path", "errors"])
+
+
+def find_specs(paths, recursive=False):
+    """Return the spec files given, those of the directories given, or found below."""
+    found = []
+    for path in paths:
+        path = Path(path)
+        if path.is_file():
+            candidates = [path]
+        elif recursive:
+            candidates = sorted(
+                p for p in path.rglob("wings-component.y*ml") if p.name in SPEC_FILES
+            )
+        else:
+            candidates = [path / name for name in SPEC_FILES if (path / name).exists()]
+            candidates = candidates[:1]
+            if not candidates:
+                log.warning(f"No component specification in {path}")
+        found.extend(c for c in candidates if c not in found)
+    return found
+
+
+def validate_file(path):
+    """Validate one spec file, reporting YAML errors like schema errors."""
+    from yaml import YAMLError
+
+    from wcm import _yaml
+
+    try:
+        spec = _yaml.load(path)
+    except (OSError, YAMLError) as e:
+        return ValidationResult(str(path), [{"path": "$", "message": str(e)}])
+    return ValidationResult(str(path), list(_schema.iter_errors(spec)))
+
+
+def validate_files(paths, jobs=None):
+    """Validate spec files, across ``jobs`` processes for large batches.
+
+    :return: A :class:`ValidationResult` per spec, in the order of ``paths``
+    :rtype: list
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(paths) < PARALLEL_THRESHOLD:
+        return [validate_file(p) for p in paths]
+
+    # Generate the compiled validator once, before the workers look for it on disk.
+    _schema.compiled_validator()
+    chunksize = max(1, len(paths) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(validate_file, paths, chunksize=chunksize))
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""Publish every component of a workspace in dependency order.
+
+A workspace is a directory tree holding many components. Each component
+depends on the data types it declares under ``wings.data`` and on its
+``wings.componentType``. Every type is a node of the graph of its own, created
+once however many components share it, and each component is published as
+soon as the types it depends on exist. At most ``jobs`` nodes run at once.
+
+When a node fails, the components depending on it are ``blocked``. With
+``fail_fast``, nodes that have not started yet are ``cancelled`` instead of run.
+"""
+
+import asyncio
+import functools
+import logging
+from collections import OrderedDict, namedtuple
+from pathlib import Path
+
+from wcm import _component, _engine, _list, _session, _timing
+
+log = logging.getLogger()
+
+# ``kind`` is ``dataType``, ``componentType`` or ``component``, ``name`` the type or
+# component directory.
+Node = namedtuple("Node", ["kind", "name"])
+# Status is ``created``, ``exists``, ``published``, ``unchanged``, ``skipped``,
+# ``failed``, ``blocked`` or ``cancelled``.
+NodeResult = namedtuple("NodeResult", ["node", "status", "error"])
+
+
+class Graph:
+    """The types and components of a workspace, each with the nodes it depends on."""
+
+    def __init__(self, specs):
+        self.specs = specs
+        self.deps = OrderedDict()
+        self.data_types = {}  # name -> declaration
+        self.conflicts = {}  # name -> component directories declaring it differently
+        declared_by = {}
+
+        for component_dir, spec in specs.items():
+            wings_component = spec["wings"]
+            deps = set()
+            for dtype, declaration in wings_component.get("data", {}).items():
+                node = Node("dataType", dtype)
+                self.deps.setdefault(node, set())
+                deps.add(node)
+                # Only the type and its properties are shared, not the files.
+                declaration = {
+                    k: v for k, v in (declaration or {}).items() if k != "files"
+                }
+                if dtype not in self.data_types:
+                    self.data_types[dtype] = declaration
+                    declared_by[dtype] = [component_dir]
+                elif self.data_types[dtype] != declaration:
+                    dirs = self.conflicts.setdefault(dtype, list(declared_by[dtype]))
+                    dirs.append(component_dir)
+                else:
+                    declared_by[dtype].append(component_dir)
+            node = Node("componentType", wings_component["componentType"])
+            self.deps.setdefault(node, set())
+            deps.add(node)
+            self.deps[Node("component", component_dir)] = deps
+
+    def order(self):
+        """Return the nodes in levels, each only depending on the levels before it."""
+        done, levels = set(), []
+        while len(done) < len(self.deps):
+            level = [n for n, d in self.deps.items() if n not in done and d <= done]
+            levels.append(level)
+            done.update(level)
+        return levels
+
+    def shared(self):
+        """Return the type nodes used by several components, with how many use them."""
+        users = {}
+        for node, deps in self.deps.items():
+            for dep in deps:
+                users[dep] = users.get(dep, 0) + 1
+        return {node: n for node, n in users.items() if n > 1}
+
+
+def discover(root="."):
+    """Return the graph of the valid components under ``root``, and the errors."""
+    component_dirs = _component.find_components([root], recursive=True)
+    specs, errors = _component.validate_all(component_dirs)
+    return Graph(specs), errors
+
+
+def format_graph(graph):
+    lines = []
+    shared = graph.shared()
+    for n, level in enumerate(graph.order()):
+        lines.append(f"level {n}:")
+        for node in level:
+            users = f" (shared by {shared[node]})" if node in shared else ""
+            lines.append(f"  {node.kind:<14} {node.name}{users}")
+    for dtype, dirs in graph.conflicts.items():
+        dirs = ", ".join(map(str, dirs))
+        lines.append(f"conflict: data type {dtype} is declared differently by {dirs}")
+    return lines
+
+
+async def _schedule(graph, run_node, jobs, fail_fast):
+    """Run ``run_node(node)`` for every node once the nodes it depends on are done."""
+    limit = asyncio.Semaphore(jobs)
+    results = {}
+    tasks = {}
+    failed = asyncio.Event()
+
+    async def run(node):
+        deps = graph.deps[node]
+        await asyncio.gather(*(tasks[dep] for dep in deps))
+        undone = [dep for dep in deps if results[dep].status in ("failed", "blocked")]
+        if undone:
+            results[node] = NodeResult(
+                node, "blocked", f"{undone[0].kind} {undone[0].name} was not created"
+            )
+            return
+        if any(results[dep].status == "cancelled" for dep in deps):
+            results[node] = NodeResult(node, "cancelled", None)
+            return
+        async with limit:
+            if fail_fast and failed.is_set():
+                results[node] = NodeResult(node, "cancelled", None)
+                return
+            try:
+                results[node] = NodeResult(node, await run_node(node), None)
+            except Exception as err:
+                log.error(f"{node.kind} {node.name}: {err}")
+                results[node] = NodeResult(node, "failed", err)
+                failed.set()
+
+    for level in graph.order():
+        for node in level:
+            tasks[node] = asyncio.ensure_future(run(node))
+    await asyncio.gather(*tasks.values())
+    return [results[node] for node in graph.deps]
+
+
+def publish_workspace(
+    graph,
+    profile=None,
+    creds={},
+    jobs=4,
+    fail_fast=False,
+    ignore_data=False,
+    overwrite=None,
+    incremental=True,
+    compresslevel=None,
+    upload_jobs=None,
+):
+    """Create the types of a workspace once, then publish its components in order.
+
+    :return: A :class:`NodeResult` per node of ``graph``
+    :rtype: list
+    """
+    artifacts = {
+        d: _component.Artifacts(d, spec, compresslevel)
+        for d, spec in graph.specs.items()
+    }
+    component_types, data_types = set(), set()
+
+    with _session.client(
+        profile=profile, pool_size=_engine.SERVER_CONCURRENCY, **creds
+    ) as cli:
+        known = _component.known_types(profile, cli, incremental)
+        existing_types = {}
+
+        async def run_node(engine, node):
+            if node.kind == "dataType":
+                if node.name in graph.conflicts:
+                    dirs = ", ".join(map(str, graph.conflicts[node.name]))
+                    raise ValueError(f"declared differently by {dirs}")
+                existed = known is not None and await engine.call(
+                    cli, known.exists, node.name
+                )
+                create = _timing.timed(
+                    "create_data_types", _component.create_data_type,
+                    data_type=node.name,
+                )
+                await engine.call(
+                    cli, create, cli, node.name, graph.data_types[node.name], known,
+                    properties=not ignore_data,
+                )
+                data_types.add(node.name)
+                return "exists" if existed else "created"
+
+            if node.kind == "componentType":
+                if "tree" not in existing_types:
+                    existing_types["tree"] = asyncio.ensure_future(
+                        engine.call(cli, cli.component.get_all_items)
+                    )
+                tree = await existing_types["tree"]
+                component_types.update(name for name, _, _ in _list.compact(tree or {}))
+                if node.name in component_types:
+                    return "exists"
+                new_type = _timing.timed(
+                    "new_component_type", cli.component.new_component_type,
+                    type=node.name,
+                )
+                await engine.call(cli, new_type, node.name, None)
+                component_types.add(node.name)
+                return "created"
+
+            try:
+                status, _ = await _component.publish_component(
+                    engine, Path(node.name), cli, graph.specs[node.name],
+                    artifacts[node.name], ignore_data, overwrite, incremental,
+                    upload_jobs, known, component_types, data_types,
+                )
+            except Exception:
+                # A type the cache lists may be why the publish failed, list them again
+                # next time.
+                if known is not None:
+                    known.invalidate()
+                raise
+            return status
+
+        async def main(engine):
+            try:
+                run = functools.partial(run_node, engine)
+                return await _schedule(graph, run, jobs, fail_fast)
+            finally:
+                await asyncio.gather(*(a.wait() for a in artifacts.values()))
+
+        try:
+            results = _engine.run(main)
+        finally:
+            for a in artifacts.values():
+                a.close()
+
+    if any(r.status in ("created", "published") for r in results):
+        _list.invalidate_cache(profile or "default")
+    return results
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""YAML reading and writing for component specifications.
+
+Uses libyaml's ``CLoader``/``CDumper`` when PyYAML was built with it and falls
+back to the pure Python implementation otherwise. Parsed files are cached in
+memory, keyed by path, size and modification time, so batch operations do not
+parse an unchanged spec twice.
+"""
+
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import yaml
+
+try:
+    from yaml import CDumper as Dumper
+    from yaml import CLoader as Loader
+except ImportError:
+    from yaml import Dumper, Loader
+
+# Number of parsed files kept in memory.
+CACHE_SIZE = 256
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def loads(text):
+    return yaml.load(text, Loader=Loader)
+
+
+def dump(data, stream=None, **kwargs):
+    """Serialize ``data`` in key order, to ``stream`` or to a returned string."""
+    kwargs.setdefault("sort_keys", False)
+    return yaml.dump(data, stream, Dumper=Dumper, **kwargs)
+
+
+def load(path):
+    """Parse a YAML file, reusing the previous result if the file is unchanged.
+
+    Every call returns a fresh copy, callers may modify it.
+    """
+    path = os.path.abspath(str(path))
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+    if cached is not None:
+        return pickle.loads(cached)
+
+    with open(path) as fh:
+        data = yaml.load(fh, Loader=Loader)
+
+    with _lock:
+        _cache[key] = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        # Drop entries of older versions of this file and the least recently used ones.
+        for k in [k for k in _cache if k[0] == path and k != key]:
+            del _cache[k]
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return data
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
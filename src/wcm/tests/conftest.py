@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+import json
+from urllib.parse import urlparse
+
+import pytest
+import requests
+import yaml
+from requests.adapters import BaseAdapter
+
+
+class _Recorder:
+    # Local identifier helpers, they do not talk to the server.
+    _IDS = {"get_component_id", "get_type_id", "get_data_id"}
+
+    def __init__(self, calls, name, responses):
+        self._calls = calls
+        self._name = name
+        self._responses = responses
+
+    def __getattr__(self, attr):
+        def call(*args, **kwargs):
+            if attr in self._IDS:
+                return args[0]
+            self._calls.append((f"{self._name}.{attr}", args))
+            response = self._responses.get(attr)
+            return response(*args) if callable(response) else response
+
+        return call
+
+
+class _FakeTransport(BaseAdapter):
+    """Answer raw HTTP requests made through the client's session."""
+
+    def __init__(self, registry):
+        super().__init__()
+        self.registry = registry
+
+    def send(self, request, **kwargs):
+        endpoint = urlparse(request.url).path.rsplit("/", 1)[-1]
+        self.registry.calls.append((f"http.{endpoint}", (request.method,)))
+        self.registry.requests.append(request)
+
+        resp = requests.Response()
+        resp.request = request
+        resp.url = request.url
+        resp.status_code = 200
+        resp.headers["Content-Type"] = "application/json"
+        body = self.registry.http.get(
+            endpoint, {"success": True, "location": f"/wings/{endpoint}"}
+        )
+        resp._content = body(request) if callable(body) else json.dumps(body).encode()
+        resp._content_consumed = True
+        return resp
+
+    def close(self):
+        pass
+
+
+def _fake_api_client(registry):
+    class FakeApiClient:
+        """Stand-in for ``wings.ApiClient`` that records every API call."""
+
+        def __init__(self, **kwargs):
+            self.kwargs = kwargs
+            self.server = kwargs["server"]
+            self.session = requests.Session()
+            self.session.mount("http://", _FakeTransport(registry))
+            self.component = _Recorder(registry.calls, "component", registry.component)
+            self.data = _Recorder(registry.calls, "data", registry.data)
+            registry.clients.append(self)
+            if self.login() is False:
+                raise ValueError("Login failed")
+
+        def login(self):
+            registry.calls.append(("login", ()))
+            self.session.cookies.set("JSESSIONID", f"session-{len(registry.clients)}")
+            return True
+
+        def logout(self):
+            registry.calls.append(("logout", ()))
+
+        def get_request_url(self):
+            return self.server + "/users/tester/test/"
+
+        @staticmethod
+        def check_request(resp):
+            resp.raise_for_status()
+            return resp
+
+        def close(self):
+            self.logout()
+
+    return FakeApiClient
+
+
+class FakeRegistry:
+    def __init__(self):
+        self.clients = []
+        self.calls = []
+        self.component = {}
+        self.data = {"upload_data_for_type": lambda path, dtype: path.name}
+        self.http = {}
+        self.requests = []
+
+    def names(self):
+        return [name for name, _ in self.calls]
+
+
+@pytest.fixture(autouse=True)
+def wcm_home(monkeypatch, tmp_path):
+    """Keep caches, sessions and credentials of every test out of ``~/.wcm``."""
+    monkeypatch.setenv("WCM_HOME", str(tmp_path / "wcm-home"))
+    monkeypatch.setenv(
+        "WCM_CREDENTIALS_FILE", str(tmp_path / "wcm-home" / "credentials")
+    )
+    return tmp_path / "wcm-home"
+
+
+@pytest.fixture
+def fake_wings(monkeypatch, tmp_path):
+    import wings
+
+    registry = FakeRegistry()
+    monkeypatch.setattr(wings, "ApiClient", _fake_api_client(registry))
+    monkeypatch.setenv("WCM_WINGS_SERVER", "http://wings.test/wings-portal")
+    monkeypatch.setenv("WCM_WINGS_EXPORT_URL", "http://wings.test")
+    monkeypatch.setenv("WCM_USER", "tester")
+    monkeypatch.setenv("WCM_PASSWORD", "secret")
+    monkeypatch.setenv("WCM_DOMAIN", "test")
+    return registry
+
+
+@pytest.fixture
+def component_dir(tmp_path):
+    comp = tmp_path / "component"
+    (comp / "src").mkdir(parents=True)
+    (comp / "src" / "run").write_text("#!/bin/bash\necho hello\n")
+    (comp / "data").mkdir()
+    (comp / "data" / "sample.csv").write_text("a,b\n1,2\n")
+    spec = {
+        "name": "hello",
+        "version": "1.0.0",
+        "schemaVersion": "0.0.1",
+        "wings": {
+            "componentType": "Greeting",
+            "documentation": "Say hello",
+            "inputs": [
+                {
+                    "role": "in",
+                    "prefix": "-i",
+                    "isParam": False,
+                    "type": "dcdom:Table",
+                    "dimensionality": 0,
+                }
+            ],
+            "outputs": [
+                {
+                    "role": "out",
+                    "prefix": "-o",
+                    "isParam": False,
+                    "type": "dcdom:Table",
+                    "dimensionality": 0,
+                }
+            ],
+            "data": {"Table": {"files": ["data/sample.csv"], "format": "csv"}},
+        },
+    }
+    with (comp / "wings-component.yml").open("w") as fh:
+        yaml.dump(spec, fh, sort_keys=False)
+    return comp
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import time
+import zipfile
+from pathlib import Path
+
+from wcm import _archive
+
+
+def _tree(root):
+    (root / "pkg").mkdir(parents=True)
+    (root / "run").write_text("#!/bin/bash\n" * 100)
+    (root / "pkg" / "model.py").write_text("print('model')\n" * 100)
+    (root / "pkg" / "inputs.zip").write_bytes(bytes(range(256)) * 4)
+
+
+def test_archive_is_reproducible(tmp_path):
+    _tree(tmp_path / "a")
+    _tree(tmp_path / "b")
+    os.utime(str(tmp_path / "b" / "run"), (time.time() - 3600,) * 2)
+
+    a, b = io.BytesIO(), io.BytesIO()
+    _archive.write_archive(tmp_path / "a", a)
+    _archive.write_archive(tmp_path / "b", b)
+    assert a.getvalue() == b.getvalue()
+    names = [i.filename for i in zipfile.ZipFile(a).infolist()]
+    assert names == ["run", "pkg/", "pkg/inputs.zip", "pkg/model.py"]
+
+
+def test_compressed_files_are_stored(tmp_path):
+    _tree(tmp_path)
+    (tmp_path / "pkg" / "table.py").write_text(
+        "\n".join(f"x{i} = {i * 7919 % 10007}" for i in range(5000))
+    )
+    fast, small = io.BytesIO(), io.BytesIO()
+    _archive.write_archive(tmp_path, fast, compresslevel=1)
+    _archive.write_archive(tmp_path, small, compresslevel=9)
+    infos = {i.filename: i for i in zipfile.ZipFile(small).infolist()}
+    assert infos["pkg/inputs.zip"].compress_type == zipfile.ZIP_STORED
+    assert infos["pkg/model.py"].compress_type == zipfile.ZIP_DEFLATED
+    assert len(small.getvalue()) < len(fast.getvalue())
+
+
+def test_files_are_streamed(tmp_path, monkeypatch):
+    _tree(tmp_path)
+    (tmp_path / "weights.bin").write_bytes(os.urandom(3 * 1024 * 1024))
+
+    def read_bytes(self):
+        raise AssertionError("files must not be read whole")
+
+    monkeypatch.setattr(Path, "read_bytes", read_bytes)
+    out = io.BytesIO()
+    _archive.write_archive(tmp_path, out)
+    with zipfile.ZipFile(out) as zf:
+        assert zf.testzip() is None
+        assert zf.getinfo("weights.bin").file_size == 3 * 1024 * 1024
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+from wcm import _component
+
+
+def test_publish_uses_one_session(fake_wings, component_dir):
+    _component.deploy_component(component_dir, profile="default")
+
+    assert len(fake_wings.clients) == 1
+    assert fake_wings.names().count("component.get_component_description") == 2
+    assert "http.upload" in fake_wings.names()
+    assert "component.set_component_location" in fake_wings.names()
+
+
+def test_skip_reuses_remote_description(fake_wings, component_dir, monkeypatch):
+    fake_wings.component["get_component_description"] = {"id": "hello-1.0.0"}
+
+    def fail(*args):
+        raise AssertionError("a skipped component must not be hashed or archived")
+
+    monkeypatch.setattr(_component._manifest, "compute_state", fail)
+    monkeypatch.setattr(_component._archive, "write_archive", fail)
+
+    assert _component.deploy_component(component_dir) == {"id": "hello-1.0.0"}
+    assert len(fake_wings.clients) == 1
+    assert fake_wings.names() == ["login", "component.get_component_description"]
+
+
+def test_batch_publish_reports_each_component(fake_wings, component_dir, tmp_path):
+    other = tmp_path / "nested" / "broken"
+    other.mkdir(parents=True)
+    (other / "wings-component.yaml").write_text("name: broken\n")
+
+    dirs = _component.find_components([tmp_path], recursive=True)
+    assert sorted(dirs) == sorted([component_dir, other])
+
+    results = {r.component_dir: r for r in _component.deploy_components(dirs, jobs=2)}
+    assert results[component_dir].status == "published"
+    assert results[other].status == "failed"
+    assert len(fake_wings.clients) == 1
+
+
+def test_republish_sends_only_changed_parts(fake_wings, component_dir):
+    _component.deploy_component(component_dir)
+    fake_wings.component["get_component_description"] = {"id": "hello-1.0.0"}
+
+    del fake_wings.calls[:]
+    _component.deploy_component(component_dir, overwrite=True)
+    assert fake_wings.names() == ["component.get_component_description"]
+
+    (component_dir / "data" / "sample.csv").write_text("a,b\n3,4\n")
+    del fake_wings.calls[:]
+    _component.deploy_component(component_dir, overwrite=True)
+    assert fake_wings.names() == [
+        "component.get_component_description",
+        "http.upload",
+        "data.add_data_for_type",
+        "data.set_data_location",
+        "component.get_component_description",
+    ]
+
+
+def test_ignore_data_does_not_read_data_files(fake_wings, component_dir):
+    (component_dir / "data" / "sample.csv").unlink()
+
+    _component.deploy_component(component_dir, ignore_data=True)
+    assert "http.upload" in fake_wings.names()
+    assert "data.add_data_for_type" not in fake_wings.names()
+
+
+def test_failed_data_upload_is_retried(fake_wings, component_dir, monkeypatch):
+    attempts = []
+
+    def flaky(request):
+        if b"sample.csv" in request.body:
+            attempts.append(request)
+            if len(attempts) < 3:
+                raise OSError("connection reset")
+        return b'{"success": true, "location": "/wings/upload"}'
+
+    monkeypatch.setattr(_component, "UPLOAD_RETRY_DELAY", 0)
+    fake_wings.http["upload"] = flaky
+    _component.deploy_component(component_dir)
+    assert len(attempts) == 3
+
+
+def test_dry_run_plans_without_changes(fake_wings, component_dir, capsys):
+    [plan] = _component.plan_components([component_dir])
+
+    assert fake_wings.names() == [
+        "login",
+        "component.get_component_description",
+        "data.get_all_items",
+    ]
+    assert [op.name for op in plan.operations] == [
+        "new_data_type", "add_type_properties", "upload_data", "new_component_type",
+        "new_component", "save_component", "upload_component", "describe",
+    ]
+    upload = plan.operations[2]
+    assert (upload.target, upload.bytes) == ("data/sample.csv", 8)
+    assert not (component_dir / ".wcm-manifest.json").exists()
+
+    _component.deploy_component(component_dir)
+    fake_wings.component["get_component_description"] = {"id": "hello-1.0.0"}
+    (component_dir / "src" / "run").write_text("#!/bin/bash\necho bye\n")
+    _component.deploy_component(component_dir, overwrite=True, dry_run=True)
+    out = capsys.readouterr().out.splitlines()
+    assert out[0].startswith("publish")
+    assert [line.split()[0] for line in out[1:-1]] == ["upload_component", "describe"]
+    assert out[-1].strip().startswith("3 requests")
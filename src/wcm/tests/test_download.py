@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import zipfile
+
+from wcm import _download
+
+
+EXPORT = "http://wings.test/export/users/tester/test"
+
+
+def _description(comp_id):
+    return {
+        "id": f"{EXPORT}/components/library.owl#{comp_id}",
+        "location": "/wings/components/" + comp_id,
+        "type": 2,
+        "documentation": " Say hello ",
+        "inputs": [
+            {
+                "id": "in",
+                "role": "in",
+                "prefix": "-i",
+                "isParam": False,
+                "dimensionality": 0,
+                "type": f"{EXPORT}/data/ontology.owl#Table",
+            }
+        ],
+        "outputs": [],
+    }
+
+
+def _zip(comp_id):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        run = zipfile.ZipInfo(f"{comp_id}/run")
+        run.external_attr = 0o755 << 16
+        zf.writestr(run, "#!/bin/bash\n")
+        zf.writestr(f"{comp_id}/lib/model.py", "print('model')\n")
+        zf.writestr("../escape.txt", "nope")
+    return buf.getvalue()
+
+
+def test_download_extracts_source_tree(fake_wings, tmp_path):
+    fake_wings.component["get_component_description"] = lambda cid: _description(cid)
+    fake_wings.http["fetch"] = lambda request: _zip("hello-1")
+
+    _download.download("hello-1", download_path=str(tmp_path))
+
+    src = tmp_path / "hello-1" / "src"
+    assert (src / "lib" / "model.py").read_text() == "print('model')\n"
+    assert os.access(str(src / "run"), os.X_OK)
+    assert not (tmp_path / "hello-1" / "components").exists()
+    assert not (tmp_path / "hello-1" / "escape.txt").exists()
+    assert (tmp_path / "hello-1" / "wings-component.yaml").exists()
+
+
+def _tree(*classes):
+    def node(name, kind):
+        component = {"id": "http://wings.test/library.owl#" + name, "type": kind}
+        return {"cls": {"component": component}}
+
+    return {
+        "children": [
+            dict(node(cls, 1), children=[node(c, 2) for c in comps])
+            for cls, comps in classes
+        ]
+    }
+
+
+def test_bulk_download_with_pattern(fake_wings, tmp_path):
+    fake_wings.component["get_all_items"] = _tree(
+        ("Greeting", ["hello-1", "hello-2"]), ("Other", ["bye-1"])
+    )
+    fake_wings.component["get_component_description"] = lambda cid: _description(cid)
+    fake_wings.http["fetch"] = lambda request: _zip("x")
+
+    out = tmp_path / "mirror"
+    out.mkdir()
+    results = _download.download_components(
+        pattern="hello-*", download_path=str(out), jobs=2
+    )
+
+    assert sorted((r.id, r.status) for r in results) == [
+        ("hello-1", "downloaded"),
+        ("hello-2", "downloaded"),
+    ]
+    assert len(fake_wings.clients) == 1
+    assert sorted(os.listdir(str(out))) == ["hello-1", "hello-2"]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from wcm import _engine
+
+
+def _client(server):
+    return SimpleNamespace(
+        kwargs={"username": "tester", "server": server, "domain": "test"}
+    )
+
+
+def test_requests_are_limited_per_server():
+    lock = threading.Lock()
+    running = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+
+    def request(server):
+        with lock:
+            running[server] += 1
+            peak[server] = max(peak[server], running[server])
+        time.sleep(0.02)
+        with lock:
+            running[server] -= 1
+        return server
+
+    async def main(engine):
+        calls = [engine.call(_client(s), request, s) for s in "ab" * 6]
+        return await asyncio.gather(*calls)
+
+    assert _engine.run(main, concurrency=2) == list("ab" * 6)
+    assert peak == {"a": 2, "b": 2}
+
+
+def test_run_inside_a_running_loop():
+    async def main(engine):
+        return await engine.work(sum, [1, 2])
+
+    async def caller():
+        return _engine.run(main)
+
+    assert asyncio.run(caller()) == 3
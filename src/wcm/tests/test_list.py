@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+from wcm import _list
+from wcm.tests.test_download import _tree
+
+
+def test_listing_is_cached_and_filtered(fake_wings, capsys):
+    fake_wings.component["get_all_items"] = _tree(
+        ("Greeting", ["hello-1", "hello-2"]), ("Other", ["bye-1"])
+    )
+
+    _list.list_components(fmt="jsonl", name_pattern="hello-*")
+    _list.list_components(fmt="json", type_pattern="Oth*")
+
+    out = capsys.readouterr().out.splitlines()
+    assert [json.loads(line) for line in out[:2]] == [
+        {"type": "Greeting", "id": "hello-1"},
+        {"type": "Greeting", "id": "hello-2"},
+    ]
+    assert json.loads(out[2]) == [{"type": "Other", "components": ["bye-1"]}]
+    assert fake_wings.names().count("component.get_all_items") == 1
+
+    _list.list_components(refresh=True)
+    assert fake_wings.names().count("component.get_all_items") == 2
+    assert "    └─ hello-2" in capsys.readouterr().out
+
+
+def test_tree_depth_limit_and_count(fake_wings, capsys):
+    tree = _tree(("Greeting", ["hello-1", "hello-2", "hello-3"]))
+    hello = tree["children"][0]["children"][0]
+    hello["children"] = _tree(("x", []))["children"] + [{"cls": None}]
+    # An empty component type is not a component.
+    tree["children"][0]["children"] += _tree(("Farewell", []))["children"]
+    fake_wings.component["get_all_items"] = tree
+
+    _list.list_components(limit=2)
+    assert capsys.readouterr().out.splitlines() == [
+        "[Greeting]",
+        "  └─┐",
+        "    ├─ hello-1",
+        "    │  └─ x",
+        "    ├─ hello-2",
+        "    └─ ... 2 more",
+        "",
+    ]
+
+    _list.list_components(depth=1)
+    assert capsys.readouterr().out.splitlines() == ["[Greeting]", ""]
+
+    _list.list_components(fmt="count")
+    assert capsys.readouterr().out.splitlines() == ["[Greeting] 3", "3 components"]
+
+    _list.list_components(fmt="jsonl")
+    ids = [json.loads(line)["id"] for line in capsys.readouterr().out.splitlines()]
+    assert ids == ["hello-1", "hello-2", "hello-3"]
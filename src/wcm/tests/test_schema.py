@@ -1,5 +1,82 @@
 # -*- coding: utf-8 -*-
 
+import pytest
+
+from wcm import _schema, _validate
+
 
 def test_schema_fail():
     assert True
+
+
+def _spec(**wings):
+    return {"name": "hello", "version": "1.0.0", "wings": wings}
+
+
+def test_errors_have_json_paths(monkeypatch):
+    spec = _spec(
+        inputs=[
+            {
+                "role": "in",
+                "prefix": "-i",
+                "isParam": "no",
+                "type": "x",
+                "dimensionality": 0,
+            }
+        ]
+    )
+    for compiled in (True, False):
+        if not compiled:
+            monkeypatch.setattr(_schema, "compiled_validator", lambda: None)
+        assert list(_schema.iter_errors(spec)) == [
+            {
+                "path": "$.wings.inputs[0].isParam",
+                "message": "'no' is not of type 'boolean'",
+            }
+        ]
+        assert list(_schema.iter_errors(_spec(inputs=[]))) == []
+
+
+def test_validator_is_loaded_once(monkeypatch):
+    list(_schema.iter_errors(_spec(inputs=[])))
+
+    def dumps(*args, **kwargs):
+        raise AssertionError("the validator cache key was rebuilt")
+
+    monkeypatch.setattr(_schema.json, "dumps", dumps)
+    assert list(_schema.iter_errors(_spec(inputs=[]))) == []
+
+
+def test_validate_many_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(_validate, "PARALLEL_THRESHOLD", 2)
+    for n in range(3):
+        (tmp_path / f"c{n}").mkdir()
+        (tmp_path / f"c{n}" / "wings-component.yml").write_text(
+            f"name: c{n}\nversion: '{n}'\n"
+        )
+    (tmp_path / "c1" / "wings-component.yml").write_text("name: c1\n")
+
+    specs = _validate.find_specs([tmp_path], recursive=True)
+    results = _validate.validate_files(specs, jobs=2)
+
+    assert [bool(r.errors) for r in results] == [False, True, False]
+    assert results[1].errors == [
+        {"path": "$", "message": "'version' is a required property"}
+    ]
+
+
+def test_outline_sections():
+    from wcm import _makeyaml
+
+    whole = _makeyaml.outline()
+    assert _makeyaml.outline("wings") == whole["wings"]
+    assert _makeyaml.outline("#/definitions/ioData") == whole["wings"]["inputs"][0]
+
+    # Outlines are built once and handed out as copies
+    misses = _makeyaml._outline.cache_info().misses
+    whole["wings"]["inputs"].clear()
+    assert _makeyaml.outline()["wings"]["inputs"]
+    assert _makeyaml._outline.cache_info().misses == misses
+
+    with pytest.raises(KeyError):
+        _makeyaml.outline("wings.nope")
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+import os
+import stat
+
+import requests
+from requests.adapters import BaseAdapter
+
+from wcm import _session
+
+
+def test_session_is_reused_across_invocations(fake_wings):
+    with _session.client(profile="default"):
+        pass
+    with _session.client(profile="default") as cli:
+        assert cli.session.cookies.get("JSESSIONID") == "session-1"
+
+    assert fake_wings.names().count("login") == 1
+    path = _session.SessionStore("default", "", "").path
+    assert stat.S_IMODE(os.stat(str(path)).st_mode) == 0o600
+
+
+def test_expired_session_logs_in_again(fake_wings, monkeypatch):
+    with _session.client(profile="default"):
+        pass
+    monkeypatch.setattr(_session, "SESSION_TTL", -1)
+    with _session.client(profile="default"):
+        pass
+
+    assert fake_wings.names().count("login") == 2
+
+
+class _LoginFormAdapter(BaseAdapter):
+    """Answer with the WINGS login form until the second session is used."""
+
+    def send(self, request, **kwargs):
+        resp = requests.Response()
+        resp.request = request
+        resp.url = request.url
+        resp.status_code = 200
+        if "session-2" in request.headers.get("Cookie", ""):
+            resp.headers["Content-Type"] = "application/json"
+            resp._content = b"{}"
+        else:
+            resp.headers["Content-Type"] = "text/html"
+            resp._content = b'<form action="j_security_check">'
+        return resp
+
+    def close(self):
+        pass
+
+
+def test_auth_failure_logs_in_again_and_replays(fake_wings):
+    with _session.client(profile="default"):
+        pass
+    with _session.client(profile="default") as cli:
+        cli.session.mount("http://", _LoginFormAdapter())
+        assert cli.session.get("http://wings.test/wings-portal/x").json() == {}
+
+    assert fake_wings.names().count("login") == 2
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import wcm
+
+HEAVY_MODULES = {"wings", "requests", "yaml", "jsonschema", "semver"}
+
+
+def _imported_modules(code, **env):
+    src = str(Path(wcm.__file__).resolve().parent.parent)
+    env = dict({"WCM_NO_VERSION_CHECK": "1"}, **env)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=dict(env, PYTHONPATH=src),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    modules = set()
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            modules.add(line.rsplit("|", 1)[1].strip().split(".")[0])
+    return modules
+
+
+def test_entry_point_is_lazy():
+    assert not HEAVY_MODULES & _imported_modules("import wcm.__main__")
+
+
+def test_help_is_lazy():
+    code = "import sys; sys.argv = ['wcm', '--help']; import wcm.__main__ as m; m.cli()"
+    assert not HEAVY_MODULES & _imported_modules(code)
+
+
+def test_validate_skips_publish_stack():
+    imported = _imported_modules("import wcm._validate")
+    assert not {"wings", "requests", "semver"} & imported
+
+
+def test_version_with_warm_cache_is_lazy(tmp_path):
+    cache = tmp_path / "cache"
+    cache.mkdir(parents=True)
+    now = time.time()
+    latest = {"version": "999.0.0", "checked": now, "attempted": now}
+    (cache / "latest-version.json").write_text(json.dumps(latest))
+
+    code = (
+        "import sys; sys.argv = ['wcm', 'version']; import wcm.__main__ as m; m.cli()"
+    )
+    env = {"WCM_HOME": str(tmp_path), "WCM_NO_VERSION_CHECK": ""}
+    assert not HEAVY_MODULES & _imported_modules(code, **env)
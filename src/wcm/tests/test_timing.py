@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from wcm import _timing
+from wcm.__main__ import cli
+
+
+@pytest.fixture(autouse=True)
+def timing(monkeypatch):
+    monkeypatch.setattr(_timing, "_enabled", False)
+    _timing.reset()
+    yield
+    _timing.reset()
+
+
+def test_spans_are_only_recorded_when_enabled():
+    with _timing.span("idle"):
+        pass
+    assert _timing.spans() == []
+
+    _timing.enable()
+    with _timing.span("busy", component="c"):
+        pass
+    [span] = _timing.spans()
+    assert (span.name, span.args) == ("busy", {"component": "c"})
+    assert _timing.format_table()[1].split()[:2] == ["busy", "1"]
+
+
+def test_publish_timings(fake_wings, component_dir, tmp_path):
+    report, trace = tmp_path / "timings.json", tmp_path / "trace.json"
+    result = CliRunner().invoke(
+        cli,
+        [
+            "--offline",
+            "--timings",
+            "--timings-json",
+            str(report),
+            "--trace",
+            str(trace),
+            "publish",
+            str(component_dir),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    phases = [row["name"] for row in json.loads(report.read_text())["summary"]]
+    # Independent phases overlap, so only the first and last are in a fixed order.
+    assert phases[:2] == ["validate", "login"]
+    assert phases[-2:] == ["describe", "publish"]
+    assert sorted(phases[2:-2]) == [
+        "check_data_types", "create_data_types", "exists", "hash", "make_archive",
+        "new_component", "new_component_type", "save_component", "upload_chunk",
+        "upload_component", "upload_data",
+    ]
+
+    events = json.loads(trace.read_text())["traceEvents"]
+    assert {e["ph"] for e in events} == {"X"}
+    publishes = [e["args"] for e in events if e["name"] == "publish"]
+    assert publishes == [{"component": "hello-1.0.0"}]
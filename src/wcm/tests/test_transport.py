@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from wcm import _transport
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_sessions_share_connections(server):
+    _transport.close()
+    _transport.reset_stats()
+
+    for _ in range(3):
+        with requests.Session() as session:
+            _transport.mount(session, 2)
+            assert session.get(server + "/a").text == "ok"
+            assert session.get(server + "/b").text == "ok"
+
+    host = server.split("//")[1]
+    assert _transport.stats() == {host: {"opened": 1, "reused": 5, "resumed": 0}}
+    assert _transport.adapter()._pool_maxsize == _transport.POOL_SIZE
+
+    pools = _transport.adapter(32).poolmanager.pools
+    assert [pools.get(key).pool.maxsize for key in pools.keys()] == [32]
+    _transport.close()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+import time
+
+from wcm import _utils
+
+
+def test_version_check_uses_fresh_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("WCM_HOME", str(tmp_path))
+    monkeypatch.delenv("WCM_OFFLINE", raising=False)
+    monkeypatch.delenv("WCM_NO_VERSION_CHECK", raising=False)
+    _utils.write_cached_version("9.9.9")
+
+    def fail(timeout=None):
+        raise AssertionError("PyPI must not be queried with a warm cache")
+
+    monkeypatch.setattr(_utils, "get_latest_version", fail)
+    assert _utils.VersionCheck().start().result() == "9.9.9"
+
+
+def test_version_check_refreshes_expired_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("WCM_HOME", str(tmp_path))
+    monkeypatch.delenv("WCM_OFFLINE", raising=False)
+    monkeypatch.delenv("WCM_NO_VERSION_CHECK", raising=False)
+    with (_utils.get_cache_dir() / "latest-version.json").open("w") as fh:
+        json.dump(
+            {"version": "0.0.1", "checked": time.time() - 2 * _utils.VERSION_CHECK_TTL},
+            fh,
+        )
+
+    monkeypatch.setattr(_utils, "get_latest_version", lambda timeout=None: "1.2.3")
+    assert _utils.VersionCheck(deadline=5).start().result(timeout=5) == "1.2.3"
+    assert _utils.read_cached_version() == "1.2.3"
+
+
+def test_version_check_backs_off_after_failure(tmp_path, monkeypatch):
+    monkeypatch.setenv("WCM_HOME", str(tmp_path))
+    monkeypatch.delenv("WCM_OFFLINE", raising=False)
+    monkeypatch.delenv("WCM_NO_VERSION_CHECK", raising=False)
+    calls = []
+
+    def unreachable(timeout=None):
+        calls.append(timeout)
+        raise OSError("unreachable")
+
+    monkeypatch.setattr(_utils, "get_latest_version", unreachable)
+    assert _utils.VersionCheck().start().result(timeout=5) is None
+    assert _utils.VersionCheck().start().result(timeout=5) is None
+    assert len(calls) == 1
+
+
+def test_version_check_does_not_wait_for_slow_lookup(tmp_path, monkeypatch):
+    monkeypatch.setenv("WCM_HOME", str(tmp_path))
+    monkeypatch.delenv("WCM_OFFLINE", raising=False)
+    monkeypatch.delenv("WCM_NO_VERSION_CHECK", raising=False)
+    release = threading.Event()
+
+    def slow(timeout=None):
+        release.wait(5)
+        return "1.2.3"
+
+    monkeypatch.setattr(_utils, "get_latest_version", slow)
+    started = time.monotonic()
+    assert _utils.VersionCheck().start().result() is None
+    assert time.monotonic() - started < 0.5
+    release.set()
+
+    # The next run within the backoff does not query the index again.
+    monkeypatch.setattr(_utils, "get_latest_version", lambda timeout=None: 1 / 0)
+    assert _utils.VersionCheck().start()._thread is None
+
+
+def test_version_check_without_usable_home(tmp_path, monkeypatch):
+    (tmp_path / "file").write_text("")
+    monkeypatch.setenv("WCM_HOME", str(tmp_path / "file" / "wcm"))
+    monkeypatch.delenv("WCM_OFFLINE", raising=False)
+    monkeypatch.delenv("WCM_NO_VERSION_CHECK", raising=False)
+    monkeypatch.setattr(_utils, "get_latest_version", lambda timeout=None: "1.2.3")
+    assert _utils.VersionCheck().start().result(timeout=5) is None
+
+
+def test_version_check_disabled_offline(tmp_path, monkeypatch):
+    monkeypatch.setenv("WCM_HOME", str(tmp_path))
+    monkeypatch.setenv("WCM_OFFLINE", "1")
+    monkeypatch.setattr(_utils, "get_latest_version", lambda timeout=None: "1.2.3")
+    assert _utils.VersionCheck().start().result() is None
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""Round trips through the real ``wings`` client against the stand-in server."""
+
+import shutil
+
+import pytest
+from click.testing import CliRunner
+
+from wcm import (
+    _archive, _component, _datatypes, _download, _list, _transport, _upload, _utils,
+    _workspace,
+)
+from wcm.__main__ import cli
+from wcm.tests.wings_server import FakeWings
+
+
+@pytest.fixture
+def server(monkeypatch):
+    with FakeWings() as srv:
+        monkeypatch.setenv("WCM_WINGS_SERVER", srv.url)
+        monkeypatch.setenv("WCM_WINGS_EXPORT_URL", "http://wings.test")
+        monkeypatch.setenv("WCM_USER", "tester")
+        monkeypatch.setenv("WCM_PASSWORD", "secret")
+        monkeypatch.setenv("WCM_DOMAIN", "test")
+        yield srv
+    _transport.close()
+
+
+def test_publish_list_download(server, component_dir, tmp_path):
+    description = _component.deploy_component(component_dir)
+    assert description["id"].endswith("#hello-1.0.0")
+    assert server.state.requests["j_security_check"] == 1
+
+    assert [name for name, _, _ in _list.fetch_classes(refresh=True)] == ["Greeting"]
+
+    out = tmp_path / "out"
+    out.mkdir()
+    [result] = _download.download_components(["hello-1.0.0"], download_path=str(out))
+    assert result.status == "downloaded"
+    assert (out / "hello-1.0.0" / "src" / "run").read_text() == (
+        component_dir / "src" / "run"
+    ).read_text()
+
+    # Every command reused the persisted session.
+    assert server.state.requests["j_security_check"] == 1
+
+
+def test_metadata_edit_only_saves(server, component_dir):
+    _component.deploy_component(component_dir)
+    assert _component.diff_component(component_dir)[1] == []
+
+    spec_file = component_dir / "wings-component.yml"
+    spec_file.write_text(spec_file.read_text().replace("Say hello", "Say hello twice"))
+    [change] = _component.diff_component(component_dir)[1]
+    assert change == ("documentation", "Say hello twice", "Say hello")
+
+    before = dict(server.state.requests)
+    _component.deploy_component(component_dir, overwrite=True)
+    sent = {
+        k: v - before.get(k, 0)
+        for k, v in server.state.requests.items()
+        if v != before.get(k, 0)
+    }
+    assert sent == {"getComponentJSON": 2, "saveComponentJSON": 1}
+    assert _component.diff_component(component_dir)[1] == []
+
+
+def test_shared_data_types_are_sent_once(server, component_dir, tmp_path):
+    other = tmp_path / "other"
+    shutil.copytree(str(component_dir), str(other))
+    spec_file = other / "wings-component.yml"
+    spec_file.write_text(spec_file.read_text().replace("name: hello", "name: bye"))
+
+    _component.deploy_component(component_dir)
+    assert server.state.requests["newDataType"] == 1
+    assert server.state.requests["saveDataTypeJSON"] == 1
+
+    # A later session reads the listing from disk, and the type is already there.
+    _component.deploy_component(other)
+    assert server.state.requests["getDataHierarchyJSON"] == 1
+    assert server.state.requests["newDataType"] == 1
+    assert server.state.requests["saveDataTypeJSON"] == 1
+
+    # Without the cache the server is asked, and only a changed format is sent.
+    _datatypes.invalidate_cache()
+    spec_file.write_text(spec_file.read_text().replace("format: csv", "format: tsv"))
+    _component.deploy_component(other, overwrite=True)
+    assert server.state.requests["getDataHierarchyJSON"] == 2
+    assert server.state.requests["newDataType"] == 1
+    assert server.state.requests["saveDataTypeJSON"] == 2
+    first = next(iter(server.state.data_types.values()))
+    assert first["format"] == "tsv"
+
+
+def test_interrupted_upload_resumes(server, component_dir, monkeypatch):
+    monkeypatch.setattr(_upload, "CHUNK_SIZE", 4096)
+    monkeypatch.setattr(_component, "UPLOAD_RETRIES", 0)
+    content = bytes(range(256)) * 70
+    (component_dir / "data" / "sample.csv").write_bytes(content)
+
+    server.state.drop_chunks = {3}
+    with pytest.raises(Exception):
+        _component.deploy_component(component_dir)
+    uploaded = server.state.requests["upload"]
+
+    server.state.drop_chunks = set()
+    _component.deploy_component(component_dir, overwrite=True)
+    # Chunks 3 and 4 of the data file, and the code archive.
+    assert server.state.requests["upload"] - uploaded == 3
+    assert content in server.state.files.values()
+    assert not list(_utils.get_cache_dir("uploads").iterdir())
+
+
+def test_lost_partial_upload_starts_over(server, component_dir, monkeypatch):
+    monkeypatch.setattr(_upload, "CHUNK_SIZE", 4096)
+    monkeypatch.setattr(_component, "UPLOAD_RETRIES", 0)
+    content = bytes(range(256)) * 70
+    (component_dir / "data" / "sample.csv").write_bytes(content)
+
+    server.state.drop_chunks = {3}
+    with pytest.raises(Exception):
+        _component.deploy_component(component_dir)
+    uploaded = server.state.requests["upload"]
+
+    # The server forgets the chunks it assembled so far, e.g. it restarted.
+    server.state.drop_chunks = set()
+    server.state.partial.clear()
+    _component.deploy_component(component_dir, overwrite=True)
+    # The rejected chunk 3, chunks 0 to 4 of the data file, and the code archive.
+    assert server.state.requests["upload"] - uploaded == 7
+    assert content in server.state.files.values()
+    assert not list(_utils.get_cache_dir("uploads").iterdir())
+
+
+def test_same_named_data_files_in_a_batch(
+    server, component_dir, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(_upload, "CHUNK_SIZE", 1024)
+    contents = []
+    for n in range(4):
+        other = tmp_path / f"comp{n}"
+        shutil.copytree(str(component_dir), str(other))
+        spec_file = other / "wings-component.yml"
+        spec = spec_file.read_text()
+        spec_file.write_text(spec.replace("name: hello", f"name: c{n}"))
+        contents.append(bytes([n]) * 5000)
+        (other / "data" / "sample.csv").write_bytes(contents[-1])
+
+    dirs = [tmp_path / f"comp{n}" for n in range(4)]
+    results = _component.deploy_components(dirs, jobs=4)
+
+    assert [r.status for r in results] == ["published"] * 4
+    for content in contents:
+        assert content in server.state.files.values()
+
+
+def test_batch_creates_shared_types_once(server, component_dir, tmp_path):
+    dirs = []
+    for n in range(6):
+        dirs.append(tmp_path / f"comp{n}")
+        shutil.copytree(str(component_dir), str(dirs[-1]))
+        spec_file = dirs[-1] / "wings-component.yml"
+        spec = spec_file.read_text()
+        spec_file.write_text(spec.replace("name: hello", f"name: c{n}"))
+
+    plans = _component.plan_components(dirs, jobs=6)
+    ops = [op.name for plan in plans for op in plan.operations]
+    assert ops.count("new_data_type") == ops.count("add_type_properties") == 1
+    assert ops.count("new_component_type") == 1
+
+    results = _component.deploy_components(dirs, jobs=6)
+    assert [r.status for r in results] == ["published"] * 6
+    assert server.state.requests["newDataType"] == 1
+    assert server.state.requests["saveDataTypeJSON"] == 1
+    # ``wings`` reads the type once to work out which properties to send.
+    assert server.state.requests["getDataTypeJSON"] == 1
+    assert server.state.requests["addComponent"] == 7  # one type, six components
+
+
+def test_fan_out_to_profile_group(component_dir, wcm_home, monkeypatch):
+    built = []
+    write_archive = _archive.write_archive
+    monkeypatch.setattr(
+        _archive, "write_archive", lambda *a: built.append(a) or write_archive(*a)
+    )
+
+    with FakeWings() as dev, FakeWings() as prod:
+        wcm_home.mkdir(parents=True, exist_ok=True)
+        # Each server has its own export namespace, user and domain.
+        servers = (("dev", dev, "alice"), ("prod", prod, "bob"))
+        (wcm_home / "credentials").write_text("".join(
+            f"[{name}]\nserverWings = {srv.url}\n"
+            f"exportWingsURL = http://{name}.example\nuserWings = {user}\n"
+            f"passwordWings = secret\ndomainWings = {name}dom\n\n"
+            for name, srv, user in servers
+        ) + "[release]\nprofiles = dev prod\n")
+
+        result = CliRunner().invoke(
+            cli, ["--offline", "publish", "-p", "release", str(component_dir)]
+        )
+        assert result.exit_code == 0, result.output
+        assert len(built) == 1
+        for name, srv, user in servers:
+            [cid] = srv.state.components
+            assert cid.split("#")[-1] == "hello-1.0.0"
+            assert len(srv.state.files) == 2
+            description = srv.state.components[cid]
+            export = f"http://{name}.example/export/users/{user}/{name}dom"
+            ontology = f"{export}/data/ontology.owl#Table"
+            ios = description["inputs"] + description["outputs"]
+            assert [io["type"] for io in ios] == [ontology] * 2
+
+        lines = result.output.splitlines()
+        rows = {line.split()[0]: line.split()[1:] for line in lines}
+        assert rows["dev"] == rows["prod"] == ["1", "0", "0", "0"]
+    _transport.close()
+
+
+def test_workspace_creates_shared_types_once(server, component_dir, tmp_path):
+    root = tmp_path / "workspace"
+    for name in ("one", "two", "three"):
+        shutil.copytree(str(component_dir), str(root / name))
+        spec_file = root / name / "wings-component.yml"
+        spec = spec_file.read_text()
+        spec_file.write_text(spec.replace("name: hello", f"name: {name}"))
+
+    graph, errors = _workspace.discover(str(root))
+    assert not errors
+    results = _workspace.publish_workspace(graph, jobs=3)
+
+    assert sorted((r.node.kind, r.status) for r in results) == [
+        ("component", "published"), ("component", "published"),
+        ("component", "published"), ("componentType", "created"),
+        ("dataType", "created"),
+    ]
+    assert server.state.requests["newDataType"] == 1
+    assert server.state.requests["saveDataTypeJSON"] == 1
+    assert server.state.requests["addComponent"] == 4  # one type, three components
+    assert len(server.state.components) == 3
+
+    # A full publish bypasses the data type cache and sends the type again.
+    listed = server.state.requests["getDataHierarchyJSON"]
+    _workspace.publish_workspace(graph, overwrite=True, incremental=False)
+    assert server.state.requests["getDataHierarchyJSON"] == listed
+    assert server.state.requests["newDataType"] == 2
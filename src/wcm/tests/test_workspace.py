@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+from wcm import _workspace
+
+
+def _spec(ctype, *dtypes, fmt="csv"):
+    data = {d: {"files": [], "format": fmt} for d in dtypes}
+    return {"wings": {"componentType": ctype, "data": data}}
+
+
+def _run(graph, fail, fail_fast):
+    started = []
+
+    async def run_node(node):
+        started.append(node)
+        await asyncio.sleep(0)
+        if node.name in fail:
+            raise ValueError("boom")
+        return "done"
+
+    results = asyncio.run(_workspace._schedule(graph, run_node, 1, fail_fast))
+    return {r.node: r.status for r in results}, started
+
+
+def test_graph_orders_shared_types_first():
+    graph = _workspace.Graph(
+        {"a": _spec("Greeting", "Table"), "b": _spec("Greeting", "Table", "Text")}
+    )
+    Node = _workspace.Node
+
+    types, components = graph.order()
+    assert set(types) == {
+        Node("dataType", "Table"), Node("dataType", "Text"),
+        Node("componentType", "Greeting"),
+    }
+    assert components == [Node("component", "a"), Node("component", "b")]
+    assert graph.shared() == {
+        Node("dataType", "Table"): 2, Node("componentType", "Greeting"): 2
+    }
+
+    conflicting = _workspace.Graph(
+        {"a": _spec("Greeting", "Table"), "b": _spec("Other", "Table", fmt="tsv")}
+    )
+    assert conflicting.conflicts == {"Table": ["a", "b"]}
+
+
+def test_failures_block_dependents_or_stop_everything():
+    specs = {"a": _spec("Greeting", "Table"), "b": _spec("Other", "Text")}
+    graph = _workspace.Graph(dict(specs, c=_spec("Last")))
+    Node = _workspace.Node
+
+    statuses, _ = _run(graph, {"Table"}, fail_fast=False)
+    assert statuses[Node("component", "a")] == "blocked"
+    assert statuses[Node("component", "b")] == "done"
+    assert statuses[Node("component", "c")] == "done"
+
+    statuses, started = _run(graph, {"Table"}, fail_fast=True)
+    assert started[0] == Node("dataType", "Table")
+    assert statuses[Node("component", "a")] == "blocked"
+    assert statuses[Node("component", "b")] == "cancelled"
+    assert statuses[Node("component", "c")] == "cancelled"
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+from wcm import _yaml
+
+
+def test_load_is_cached_until_the_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / "wings-component.yml"
+    path.write_text("name: a\nwings:\n  inputs: []\n")
+    parsed = []
+    real_load = _yaml.yaml.load
+    monkeypatch.setattr(
+        _yaml.yaml, "load", lambda *a, **kw: parsed.append(1) or real_load(*a, **kw)
+    )
+
+    first = _yaml.load(path)
+    first["wings"]["inputs"].append("mutated")
+    assert _yaml.load(path) == {"name": "a", "wings": {"inputs": []}}
+    assert len(parsed) == 1
+
+    path.write_text("name: bb\n")
+    os.utime(str(path), ns=(0, 10 ** 9))
+    assert _yaml.load(path) == {"name": "bb"}
+    assert len(parsed) == 2
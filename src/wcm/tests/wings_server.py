@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""Local stand-in for a WINGS server, for tests and benchmarks.
+
+Implements the endpoints the ``wings`` client and ``wcm`` use: form login,
+component types and components, their descriptions and hierarchy, data types,
+file uploads, chunked the way plupload sends them, and component code
+downloads. Every response can be delayed by a
+fixed latency and every body, in either direction, throttled to a bandwidth, to
+approximate a remote server.
+
+    with FakeWings(latency=0.05, bandwidth=1024 * 1024) as server:
+        os.environ["WCM_WINGS_SERVER"] = server.url
+"""
+
+import io
+import json
+import re
+import threading
+import time
+import uuid
+import zipfile
+from collections import Counter
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PORTAL = "/wings-portal"
+_CHUNK = 64 * 1024
+
+LOGIN_FORM = b"""<html><body><form method="POST" action="j_security_check">
+<input name="j_username"/><input name="j_password" type="password"/>
+</form></body></html>"""
+
+
+class _State:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = set()
+        self.components = {}  # component id -> description
+        self.types = {}  # component type id -> [component ids]
+        self.data_types = {}  # data type id -> {"properties": [...], "format": ...}
+        self.files = {}  # upload location -> bytes
+        self.partial = {}  # (type, name) -> bytes of a chunked upload so far
+        # Chunk indexes whose connection is dropped, to test resumes.
+        self.drop_chunks = set()
+        self.requests = Counter()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, Nagle's algorithm would hold the body
+    # back.
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    # Transfer
+
+    def _throttle(self, size):
+        if self.server.bandwidth:
+            time.sleep(size / self.server.bandwidth)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        chunks = []
+        while length:
+            chunk = self.rfile.read(min(length, _CHUNK))
+            if not chunk:
+                break
+            self._throttle(len(chunk))
+            chunks.append(chunk)
+            length -= len(chunk)
+        return b"".join(chunks)
+
+    def _send(self, body, status=200, content_type="application/json", headers=()):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        time.sleep(self.server.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for header in headers:
+            self.send_header(*header)
+        self.end_headers()
+        for start in range(0, len(body), _CHUNK):
+            chunk = body[start:start + _CHUNK]
+            self._throttle(len(chunk))
+            self.wfile.write(chunk)
+
+    # Dispatch
+
+    def do_GET(self):
+        self._dispatch("GET", b"")
+
+    def do_POST(self):
+        self._dispatch("POST", self._body())
+
+    def _dispatch(self, method, body):
+        url = urlparse(self.path)
+        path = url.path[len(PORTAL):] if url.path.startswith(PORTAL) else url.path
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        content_type = self.headers.get("Content-Type", "")
+        if method == "POST" and "multipart/form-data" not in content_type:
+            params.update({k: v[0] for k, v in parse_qs(body.decode()).items()})
+
+        state = self.server.state
+        with state.lock:
+            state.requests[path.rsplit("/", 1)[-1]] += 1
+
+        if path == "/sparql":
+            return self._send(b"", content_type="text/plain")
+        if path == "/j_security_check":
+            session = uuid.uuid4().hex
+            with state.lock:
+                state.sessions.add(session)
+            return self._send(
+                b"",
+                content_type="text/plain",
+                headers=[("Set-Cookie", f"JSESSIONID={session}; Path=/")],
+            )
+        if path == "/jsp/logout.jsp":
+            return self._send(b"", content_type="text/plain")
+
+        match = re.match(r"^/users/[^/]+/[^/]+/(.+)$", path)
+        if not match:
+            return self._send({"error": "not found"}, status=404)
+        if self._session() not in state.sessions:
+            return self._send(LOGIN_FORM, content_type="text/html")
+
+        handler = getattr(self, "_" + match.group(1).replace("/", "_"), None)
+        if handler is None:
+            return self._send({"error": "not found"}, status=404)
+        return handler(params, body)
+
+    def _session(self):
+        for cookie in self.headers.get("Cookie", "").split(";"):
+            name, _, value = cookie.strip().partition("=")
+            if name == "JSESSIONID":
+                return value
+
+    # Components
+
+    def _components_getComponentJSON(self, params, body):
+        with self.server.state.lock:
+            description = json.dumps(
+                self.server.state.components.get(params["cid"])
+            ).encode()
+        return self._send(description)
+
+    def _components_getComponentHierarchyJSON(self, params, body):
+        state = self.server.state
+        with state.lock:
+            tree = {
+                "cls": {"component": {"id": "Component", "type": 1}},
+                "children": [
+                    {
+                        "cls": {"component": {"id": ctype, "type": 1}},
+                        "children": [
+                            {
+                                "cls": {"component": {"id": cid, "type": 2}},
+                                "children": [],
+                            }
+                            for cid in sorted(cids)
+                        ],
+                    }
+                    for ctype, cids in sorted(state.types.items())
+                ],
+            }
+        return self._send(tree)
+
+    def _components_type_addComponent(self, params, body):
+        with self.server.state.lock:
+            self.server.state.types.setdefault(params["cid"], [])
+        return self._send(b"OK", content_type="text/plain")
+
+    def _components_addComponent(self, params, body):
+        state = self.server.state
+        with state.lock:
+            cids = state.types.setdefault(params["parent_cid"], [])
+            if params["cid"] not in cids:
+                cids.append(params["cid"])
+            state.components.setdefault(
+                params["cid"],
+                {
+                    "id": params["cid"],
+                    "type": 2,
+                    "inputs": [],
+                    "outputs": [],
+                    "documentation": "",
+                },
+            )
+        return self._send(b"OK", content_type="text/plain")
+
+    def _components_saveComponentJSON(self, params, body):
+        description = json.loads(params["component_json"])
+        with self.server.state.lock:
+            previous = self.server.state.components.get(params["cid"], {})
+            description.setdefault("location", previous.get("location"))
+            self.server.state.components[params["cid"]] = description
+        return self._send(b"OK", content_type="text/plain")
+
+    def _components_setComponentLocation(self, params, body):
+        with self.server.state.lock:
+            self.server.state.components.setdefault(
+                params["cid"], {"id": params["cid"]}
+            )["location"] = params["location"]
+        return self._send(b"OK", content_type="text/plain")
+
+    def _components_fetch(self, params, body):
+        """Return the uploaded archive, nested under ``<name>/`` like WINGS does."""
+        state = self.server.state
+        with state.lock:
+            location = (state.components.get(params["cid"]) or {}).get("location")
+            archive = state.files.get(location)
+        if archive is None:
+            return self._send({"error": "not found"}, status=404)
+
+        name = params["cid"].split("#")[-1]
+        out = io.BytesIO()
+        src = zipfile.ZipFile(io.BytesIO(archive))
+        with src, zipfile.ZipFile(out, "w") as dst:
+            for info in src.infolist():
+                data = src.read(info)
+                info.filename = f"{name}/{info.filename}"
+                dst.writestr(info, data)
+        return self._send(out.getvalue(), content_type="application/zip")
+
+    # Data
+
+    def _data_newDataType(self, params, body):
+        with self.server.state.lock:
+            self.server.state.data_types.setdefault(
+                params["data_type"], {"properties": [], "format": None}
+            )
+        return self._send(b"OK", content_type="text/plain")
+
+    def _data_getDataHierarchyJSON(self, params, body):
+        with self.server.state.lock:
+            dtypes = sorted(self.server.state.data_types)
+        children = [
+            {"item": {"id": dtype, "type": 1}, "children": []} for dtype in dtypes
+        ]
+        return self._send(
+            {"item": {"id": "DataObject", "type": 1}, "children": children}
+        )
+
+    def _data_getDataTypeJSON(self, params, body):
+        with self.server.state.lock:
+            description = json.dumps(
+                self.server.state.data_types.get(params["data_type"])
+            ).encode()
+        return self._send(description)
+
+    def _data_saveDataTypeJSON(self, params, body):
+        change = json.loads(params["props_json"])
+        with self.server.state.lock:
+            dtype = self.server.state.data_types.setdefault(
+                params["data_type"], {"properties": []}
+            )
+            props = {p["id"]: p for p in dtype["properties"]}
+            for pid in change.get("del", {}):
+                props.pop(pid, None)
+            changed = dict(change.get("add", {}), **change.get("mod", {}))
+            for pid, prop in changed.items():
+                props[pid] = {"id": pid, "range": prop["range"]}
+            dtype["properties"] = list(props.values())
+            if "format" in change:
+                dtype["format"] = change["format"]
+        return self._send(b"OK", content_type="text/plain")
+
+    def _data_addDataForType(self, params, body):
+        return self._send(b"OK", content_type="text/plain")
+
+    def _data_setDataLocation(self, params, body):
+        return self._send(b"OK", content_type="text/plain")
+
+    # Uploads
+
+    def _upload(self, params, body):
+        message = BytesParser().parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+        )
+        fields, content = {}, None
+        for part in message.get_payload():
+            if part.get_filename() is not None:
+                content = part.get_payload(decode=True)
+            else:
+                fields[part.get_param("name", header="content-disposition")] = (
+                    part.get_payload()
+                )
+        if content is None:
+            return self._send({"success": False})
+
+        state = self.server.state
+        if "chunks" in fields:
+            chunk, chunks = int(fields["chunk"]), int(fields["chunks"])
+            if chunk in state.drop_chunks:
+                self.close_connection = True
+                return
+            key = (fields.get("type"), fields.get("name"))
+            with state.lock:
+                if chunk == 0:
+                    state.partial[key] = b""
+                if key not in state.partial:
+                    return self._send({"success": False})
+                state.partial[key] += content
+                if chunk < chunks - 1:
+                    return self._send({"success": True})
+                content = state.partial.pop(key)
+
+        location = "/storage/{}/{}/{}".format(
+            fields.get("type", "data"), uuid.uuid4().hex[:8], fields.get("name", "file")
+        )
+        with self.server.state.lock:
+            self.server.state.files[location] = content
+        return self._send({"success": True, "location": location})
+
+
+class FakeWings:
+    """A stand-in WINGS server on a local port, used as a context manager.
+
+    :param latency: Seconds added before every response
+    :param bandwidth: Bytes per second for request and response bodies, unlimited
+        when None
+    """
+
+    def __init__(self, latency=0.0, bandwidth=None):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.bandwidth = bandwidth
+        self.httpd.state = _State()
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}{PORTAL}"
+
+    @property
+    def state(self):
+        return self.httpd.state
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()